@@ -0,0 +1,83 @@
+"""
+Throughput of parallel bulk scoring versus the number of worker processes.
+
+Builds a synthetic extract by repeating the rows of data.csv, scores it with
+``stream_score`` for each worker count and reports rows/s and the speedup
+over one worker (``workers=1`` is always measured first, even when it is not
+among ``--workers``). Worker start-up (one bundle load per worker) is included,
+as it would be in a real run. Every worker count uses the same engine: the
+registry bundle (xgboost), or the NumPy compiled engine with ``--compiled``.
+
+Usage::
+
+    python benchmarks/parallel_scaling.py --rows 1000000 --workers 1 2 4 8 [--json results.json]
+    python benchmarks/parallel_scaling.py --compiled model/dropout_model.artifact
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+from parallel_scoring import default_workers  # noqa: E402
+from stream_scoring import stream_score  # noqa: E402
+
+
+def build_extract(path, n_rows, source=os.path.join(REPO_ROOT, "data.csv")):
+    """Write ``n_rows`` rows to ``path`` by repeating the rows of ``source``."""
+    with open(source, encoding="utf-8-sig") as fh:
+        header = fh.readline()
+        rows = fh.read().splitlines(keepends=True)
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(header)
+        written = 0
+        while written < n_rows:
+            batch = rows[:n_rows - written]
+            out.writelines(batch)
+            written += len(batch)
+
+
+def main():
+    cores = default_workers()
+    parser = argparse.ArgumentParser(description="Measure parallel scoring throughput per core count")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i <= cores], cores}))
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--model-threads", type=int, default=1)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--compiled", help="Score with this compiled model artifact in every run")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    print(f"{args.rows:,} rows, chunk size {args.chunk_size:,}, {cores} cores available")
+    results = []
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "extract.csv")
+        build_extract(input_path, args.rows)
+        # The speedup is relative to one worker, so that run comes first
+        for workers in [1] + [w for w in args.workers if w != 1]:
+            output_path = os.path.join(tmp, f"scored_{workers}.{args.format}")
+            summary = stream_score(input_path, output_path, chunk_size=args.chunk_size,
+                                   output_format=args.format, progress=None, workers=workers,
+                                   model_threads=args.model_threads, compiled_path=args.compiled)
+            if workers == 1:
+                baseline = summary['rows_per_second']
+            speedup = summary['rows_per_second'] / baseline
+            results.append({'workers': workers, 'seconds': summary['seconds'],
+                            'rows_per_second': summary['rows_per_second'], 'speedup': speedup})
+            print(f"workers={workers:3d}  {summary['rows_per_second']:12,.0f} rows/s  "
+                  f"{summary['seconds']:7.1f} s  speedup x{speedup:.2f}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({'rows': args.rows, 'cores': cores, 'results': results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Load test for the shared scoring queue with simulated concurrent sessions.
+
+Each session is a thread that submits ``--requests`` random form records
+with a random think time in between, like users of the Streamlit app. The
+same workload runs twice:
+
+- ``inline``: every session calls ``predict_dropout_risk`` itself (the app
+  before the queue)
+- ``queue``: every session submits to one ``AsyncScoringQueue``
+
+Both paths explain their predictions, as the app does, and the cache is
+off so every submission reaches the model. Reported per mode: throughput,
+latency percentiles and, for the queue, the number of model calls and the
+mean batch size. A final burst phase starts ``--burst-sessions`` sessions
+that submit one record each at the same moment, against a queue with a
+small ``--burst-max-pending`` bound, and checks the backpressure: every
+submission must end with a result or with ``ScoringQueueFull``. The
+script exits with status 1 if a queue result differs from the inline one
+or a submission is lost.
+
+Usage::
+
+    python benchmarks/queue_load_test.py --sessions 32 --requests 20 [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import numpy as np  # noqa: E402
+
+from model_registry import get_model_registry  # noqa: E402
+from scoring import (calculate_derived_features, predict_dropout_risk,  # noqa: E402
+                     predict_dropout_risk_records)
+from scoring_queue import AsyncScoringQueue, ScoringQueueFull  # noqa: E402
+from what_if import WHAT_IF_VALUES  # noqa: E402
+
+
+def random_records(n, seed=0):
+    """``n`` random form records drawn from the app's input ranges."""
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n):
+        record = {}
+        for feature, candidates in WHAT_IF_VALUES.items():
+            value = candidates[rng.integers(len(candidates))]
+            record[feature] = value if isinstance(value, str) else int(value)
+        records.append(record)
+    return records
+
+
+def run_sessions(workload, score, think_ms, seed=1):
+    """
+    Run one thread per session; ``workload`` holds the records of each session.
+
+    Returns ``(results, latencies, rejected, elapsed)`` with the results
+    keyed by ``(session, request)``.
+    """
+    results = {}
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+    start = threading.Barrier(len(workload) + 1)
+
+    def session(index, records):
+        rng = np.random.default_rng(seed + index)
+        start.wait()
+        for i, record in enumerate(records):
+            if think_ms:
+                time.sleep(rng.uniform(0, think_ms) / 1000.0)
+            submitted = time.perf_counter()
+            try:
+                result = score(record)
+            except ScoringQueueFull:
+                with lock:
+                    rejected[0] += 1
+                    results[(index, i)] = None
+                continue
+            latency = time.perf_counter() - submitted
+            with lock:
+                latencies.append(latency)
+                results[(index, i)] = result
+
+    threads = [threading.Thread(target=session, args=(index, records))
+               for index, records in enumerate(workload)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return results, latencies, rejected[0], time.perf_counter() - started
+
+
+def summarize(latencies, elapsed):
+    latency_ms = np.asarray(latencies) * 1000
+    return {
+        'completed': len(latencies),
+        'seconds': elapsed,
+        'throughput_per_second': len(latencies) / elapsed,
+        'latency_p50_ms': float(np.percentile(latency_ms, 50)),
+        'latency_p95_ms': float(np.percentile(latency_ms, 95)),
+        'latency_p99_ms': float(np.percentile(latency_ms, 99)),
+    }
+
+
+def print_mode(name, summary):
+    print(f"{name:7s} {summary['completed']:6d} predictions in {summary['seconds']:6.2f} s  "
+          f"{summary['throughput_per_second']:8.1f}/s  latency p50 {summary['latency_p50_ms']:7.2f} ms  "
+          f"p95 {summary['latency_p95_ms']:7.2f} ms  p99 {summary['latency_p99_ms']:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent app sessions against the scoring queue")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="Submissions per session")
+    parser.add_argument("--think-ms", type=float, default=50.0, help="Max pause between submissions")
+    parser.add_argument("--window-ms", type=float, default=0.0,
+                        help="Extra collection window (the app default is 0)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--burst-sessions", type=int, default=256)
+    parser.add_argument("--burst-max-pending", type=int, default=16)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    model, feature_names, encoders, scaler = get_model_registry().get().as_tuple()
+    records = random_records(max(args.sessions * args.requests, args.burst_sessions))
+    workload = [records[s * args.requests:(s + 1) * args.requests] for s in range(args.sessions)]
+    burst_workload = [[record] for record in records[:args.burst_sessions]]
+
+    def score_inline(record):
+        return predict_dropout_risk(calculate_derived_features(dict(record)), model, feature_names,
+                                    encoders, scaler, explain=True)
+
+    def score_batch(batch):
+        return predict_dropout_risk_records(batch, model, feature_names, encoders, scaler, explain=True)
+
+    # Warm up both paths (first booster call, lazy imports)
+    score_inline(records[0])
+    score_batch(records[:2])
+
+    inline_results, latencies, _, elapsed = run_sessions(workload, score_inline, args.think_ms)
+    inline = summarize(latencies, elapsed)
+    print_mode("inline", inline)
+
+    scoring_queue = AsyncScoringQueue(score_batch, max_batch_size=args.max_batch_size,
+                                      window=args.window_ms / 1000.0)
+    queue_results, latencies, _, elapsed = run_sessions(workload, scoring_queue.submit, args.think_ms)
+    queued = summarize(latencies, elapsed)
+    queued.update({key: scoring_queue.stats()[key] for key in ('batches', 'mean_batch_size',
+                                                               'max_batch_size_seen', 'max_pending_seen')})
+    scoring_queue.close()
+    print_mode("queue", queued)
+    print(f"        {queued['batches']} model calls, mean batch {queued['mean_batch_size']:.1f}, "
+          f"largest {queued['max_batch_size_seen']}; throughput x"
+          f"{queued['throughput_per_second'] / inline['throughput_per_second']:.2f}, p95 latency x"
+          f"{queued['latency_p95_ms'] / inline['latency_p95_ms']:.2f} vs. inline")
+
+    mismatches = sum(queue_results[key] != inline_results[key] for key in inline_results)
+
+    # Without think time and one record per session everything arrives at once
+    burst_queue = AsyncScoringQueue(score_batch, max_batch_size=args.max_batch_size,
+                                    window=args.window_ms / 1000.0,
+                                    max_pending=args.burst_max_pending, enqueue_timeout=0.01)
+    burst_results, latencies, rejected, elapsed = run_sessions(burst_workload, burst_queue.submit, 0)
+    burst = {'submitted': len(burst_workload), 'answered': len(latencies), 'rejected': rejected,
+             'lost': len(burst_workload) - len(burst_results), 'seconds': elapsed,
+             'max_pending_seen': burst_queue.stats()['max_pending_seen']}
+    burst_queue.close()
+    print(f"burst   {burst['submitted']} simultaneous submissions, queue bound "
+          f"{args.burst_max_pending}: {burst['answered']} answered, {burst['rejected']} rejected as busy, "
+          f"{burst['lost']} lost, most pending {burst['max_pending_seen']}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({'sessions': args.sessions, 'requests_per_session': args.requests,
+                       'think_ms': args.think_ms, 'inline': inline, 'queue': queued,
+                       'burst': burst, 'mismatches': mismatches}, fh, indent=2)
+    if mismatches or burst['lost']:
+        print(f"FAILED: {mismatches} results differ from the inline path, {burst['lost']} submissions lost")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
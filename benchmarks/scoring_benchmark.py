@@ -0,0 +1,282 @@
+"""
+Latency and throughput benchmark of the scoring pipeline, with a regression gate.
+
+Runs offline against the repository data:
+
+- ``data.csv`` (raw schema): single-record latency of
+  ``calculate_derived_features`` + ``predict_dropout_risk`` (p50/p95/p99),
+  and ``predict_dropout_risk_batch`` throughput at several batch sizes
+- ``df_clean_processed.csv`` (already encoded and scaled): model-only
+  ``predict_proba`` throughput, isolating the model artifact
+- model bundle load time (fresh ``load_bundle`` calls) and peak RSS
+
+``requests.jsonl`` is the project's change-request backlog, not student
+records, so it is not a scoring workload and is not read here.
+
+Every benchmark runs ``--rounds`` times, interleaved so that a burst of
+background load only hits some rounds, and each metric keeps its best round
+(lowest latency or load time, highest throughput). Background load only ever
+slows a round down, so the best round is the most repeatable estimate. On a
+shared machine single runs varied by up to 2x and the median of 5 rounds by
+up to 50%, while the best of 5 rounds stayed within ~15% (tail latencies
+~35%). The tolerances below are set from that spread.
+
+The results are written as JSON and compared with a stored baseline; any
+metric worse than its baseline by more than its tolerance is reported and
+the script exits with status 1. Baselines are machine dependent: refresh
+them with ``--update-baseline`` on the machine that runs the gate.
+
+Usage::
+
+    python benchmarks/scoring_benchmark.py [--json results.json]
+    python benchmarks/scoring_benchmark.py --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from model_registry import CATEGORICAL_FEATURES, get_model_registry, load_bundle  # noqa: E402
+from scoring import (EXAMPLE_STUDENT, RAW_CATEGORY_LABELS, calculate_derived_features,  # noqa: E402
+                     predict_dropout_risk, predict_dropout_risk_batch, read_student_csv)
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "scoring_baseline.json")
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+
+# Metric name (or prefix, when ending in "_") -> (direction, relative
+# tolerance). Each tolerance is about twice the largest spread of the
+# best-of-5 value measured between repeated gate runs, so that noise does not
+# fail the gate while a real regression (e.g. 1.5-2x slower) still does.
+TOLERANCES = [
+    ('single_record_p95_ms', 'lower', 0.75),
+    ('single_record_p99_ms', 'lower', 0.75),
+    ('single_record_', 'lower', 0.40),
+    ('derived_features_', 'lower', 0.40),
+    ('batch_rows_per_second_', 'higher', 0.30),
+    ('model_only_rows_per_second', 'higher', 0.30),
+    ('model_load_seconds', 'lower', 0.40),
+    ('peak_rss_mb', 'lower', 0.15),
+]
+
+
+def metric_rule(name):
+    """Return ``(direction, tolerance)`` for a metric name."""
+    for prefix, direction, tolerance in TOLERANCES:
+        if name == prefix or (prefix.endswith('_') and name.startswith(prefix)):
+            return direction, tolerance
+    return 'lower', 0.25
+
+
+def percentiles_ms(durations):
+    durations_ms = np.asarray(durations) * 1000
+    return {p: float(np.percentile(durations_ms, p)) for p in (50, 95, 99)}
+
+
+def student_records(raw):
+    """Convert raw data.csv rows into form-style student dicts."""
+    records = []
+    for row in raw[list(EXAMPLE_STUDENT)].itertuples(index=False):
+        record = dict(zip(EXAMPLE_STUDENT, row))
+        for feature in CATEGORICAL_FEATURES:
+            record[feature] = RAW_CATEGORY_LABELS[feature][int(record[feature])]
+        records.append(record)
+    return records
+
+
+def bench_single_record(bundle, records, repeat):
+    derived_times = []
+    total_times = []
+    for _ in range(repeat):
+        for record in records:
+            start = time.perf_counter()
+            data = calculate_derived_features(dict(record))
+            derived = time.perf_counter()
+            predict_dropout_risk(data, *bundle.as_tuple())
+            end = time.perf_counter()
+            derived_times.append(derived - start)
+            total_times.append(end - start)
+    total = percentiles_ms(total_times)
+    return {
+        'single_record_p50_ms': total[50],
+        'single_record_p95_ms': total[95],
+        'single_record_p99_ms': total[99],
+        'derived_features_p50_ms': percentiles_ms(derived_times)[50],
+    }
+
+
+def _best_seconds(func, min_seconds=0.5, max_runs=50):
+    """Best wall time of ``func`` over repeated runs (at least ~``min_seconds`` total)."""
+    runs = []
+    started = time.perf_counter()
+    while len(runs) < max_runs and (len(runs) < 3 or time.perf_counter() - started < min_seconds):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def bench_batches(bundle, raw, batch_sizes):
+    results = {}
+    for size in batch_sizes:
+        repeats = -(-size // len(raw))
+        batch = pd.concat([raw] * repeats, ignore_index=True).iloc[:size]
+        seconds = _best_seconds(lambda: predict_dropout_risk_batch(batch, *bundle.as_tuple()))
+        results[f'batch_rows_per_second_{size}'] = size / seconds
+    return results
+
+
+def bench_model_only(bundle, processed):
+    matrix = processed[list(bundle.feature_names)].to_numpy(np.float64)
+    seconds = _best_seconds(lambda: bundle.model.predict_proba(matrix))
+    return {'model_only_rows_per_second': len(matrix) / seconds}
+
+
+def bench_model_load(repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_bundle()
+        durations.append(time.perf_counter() - start)
+    return {'model_load_seconds': statistics.median(durations)}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmarks(single_records=500, repeat=3, load_repeat=5, batch_sizes=BATCH_SIZES, rounds=5):
+    """
+    Run every benchmark ``rounds`` times and return ``{'environment': ...,
+    'metrics': ..., 'spread': ...}``.
+
+    ``metrics`` holds the best round of each metric (see ``metric_rule``
+    for the direction) and ``spread`` the relative range of the rounds,
+    ``(worst - best) / best``.
+    """
+    import xgboost
+
+    bundle = get_model_registry().get()
+    if bundle.model is None:
+        raise SystemExit(f"No model loaded: {bundle.error}")
+    raw = read_student_csv(os.path.join(REPO_ROOT, "data.csv"))
+    processed = pd.read_csv(os.path.join(REPO_ROOT, "df_clean_processed.csv"))
+
+    records = student_records(raw.iloc[:single_records])
+    per_round = []
+    for _ in range(rounds):
+        round_metrics = {}
+        round_metrics.update(bench_model_load(load_repeat))
+        round_metrics.update(bench_single_record(bundle, records, repeat))
+        round_metrics.update(bench_batches(bundle, raw, batch_sizes))
+        round_metrics.update(bench_model_only(bundle, processed))
+        per_round.append(round_metrics)
+
+    metrics = {}
+    spread = {}
+    for name in per_round[0]:
+        values = [round_metrics[name] for round_metrics in per_round]
+        direction, _ = metric_rule(name)
+        metrics[name] = min(values) if direction == 'lower' else max(values)
+        spread[name] = (max(values) - min(values)) / metrics[name] if metrics[name] else 0.0
+    metrics['peak_rss_mb'] = peak_rss_mb()
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'xgboost': xgboost.__version__,
+            'model_version': bundle.version,
+        },
+        'rounds': rounds,
+        'metrics': metrics,
+        'spread': spread,
+    }
+
+
+def compare(metrics, baseline_metrics, tolerance_scale=1.0):
+    """Return ``(rows, regressions)`` comparing ``metrics`` with the baseline."""
+    rows = []
+    regressions = []
+    for name, value in metrics.items():
+        base = baseline_metrics.get(name)
+        if base is None:
+            rows.append((name, value, None, None, 'new'))
+            continue
+        direction, tolerance = metric_rule(name)
+        tolerance *= tolerance_scale
+        change = (value - base) / base if base else 0.0
+        worse = change > tolerance if direction == 'lower' else change < -tolerance
+        rows.append((name, value, base, change, 'REGRESSION' if worse else 'ok'))
+        if worse:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scoring pipeline against a baseline")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance-scale", type=float, default=1.0,
+                        help="Multiply every per-metric tolerance (e.g. 2 on noisy machines)")
+    parser.add_argument("--single-records", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="Independent rounds per benchmark; each metric keeps its best round")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.single_records, args.repeat, batch_sizes=args.batch_sizes,
+                             rounds=args.rounds)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(results, fh, indent=2)
+        for name, value in results['metrics'].items():
+            print(f"{name:32s} {value:14,.3f}")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        raise SystemExit(f"No baseline at {args.baseline}; create one with --update-baseline")
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+
+    rows, regressions = compare(results['metrics'], baseline['metrics'], args.tolerance_scale)
+    print(f"{'metric':32s} {'current':>14s} {'baseline':>14s} {'change':>8s}")
+    for name, value, base, change, status in rows:
+        base_text = f"{base:14,.3f}" if base is not None else f"{'-':>14s}"
+        change_text = f"{change:+8.1%}" if change is not None else f"{'-':>8s}"
+        print(f"{name:32s} {value:14,.3f} {base_text} {change_text}  {status}")
+
+    if baseline['environment'].get('model_version') != results['environment']['model_version']:
+        print("note: the baseline was recorded with a different model bundle")
+    if regressions:
+        print(f"FAILED: {len(regressions)} metric(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Soak test for the prediction and chart rendering path.
+
+Runs thousands of predictions, each followed by a gauge render and a
+confusion matrix lookup, and samples the resident set size (RSS) along the
+way. After a warm-up phase (imports, first rasterization, caches filling)
+RSS must stay flat; the script exits with status 1 if it grows by more than
+``--max-growth-mb``.
+
+Usage::
+
+    python benchmarks/soak_rendering.py --iterations 5000 [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import numpy as np  # noqa: E402
+
+from model_registry import get_model_registry  # noqa: E402
+from rendering import render_confusion_matrix, render_gauge  # noqa: E402
+from scoring import EXAMPLE_STUDENT, calculate_derived_features, predict_dropout_risk  # noqa: E402
+
+
+def rss_mb():
+    """Current resident set size of this process in MiB."""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that RSS stays flat over many predictions")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--sample-every", type=int, default=500)
+    parser.add_argument("--max-growth-mb", type=float, default=10.0)
+    parser.add_argument("--json", help="Write the RSS samples to this file")
+    args = parser.parse_args()
+
+    bundle = get_model_registry().get()
+    rng = np.random.default_rng(0)
+    confusion_matrix = np.array([[85, 15], [10, 90]])
+
+    samples = []
+    baseline = None
+    started = time.perf_counter()
+    for i in range(1, args.warmup + args.iterations + 1):
+        student = dict(EXAMPLE_STUDENT)
+        student['Curricular_units_1st_sem_approved'] = int(rng.integers(0, 11))
+        student['Curricular_units_2nd_sem_grade'] = int(rng.integers(0, 21))
+        student['Admission_grade'] = int(rng.integers(0, 201))
+        prediction = predict_dropout_risk(calculate_derived_features(student), *bundle.as_tuple())
+        render_gauge(prediction['dropout_probability'])
+        render_confusion_matrix(confusion_matrix, 'Model Confusion Matrix', bundle.version)
+
+        if i == args.warmup:
+            baseline = rss_mb()
+            samples.append({'iteration': i, 'rss_mb': baseline})
+        elif i > args.warmup and (i - args.warmup) % args.sample_every == 0:
+            samples.append({'iteration': i, 'rss_mb': rss_mb()})
+            print(f"iteration {i:7d}  rss {samples[-1]['rss_mb']:8.1f} MiB")
+
+    elapsed = time.perf_counter() - started
+    growth = max(sample['rss_mb'] for sample in samples) - baseline
+    print(f"{args.iterations} iterations after warm-up in {elapsed:.1f} s, "
+          f"RSS growth {growth:+.1f} MiB (limit {args.max_growth_mb} MiB)")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({'samples': samples, 'growth_mb': growth}, fh, indent=2)
+    if growth > args.max_growth_mb:
+        print("FAILED: memory grows with the number of predictions")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Cold-start benchmark for the scoring core and the Streamlit app module.
+
+Every measurement runs in a fresh Python interpreter so import caches do not
+carry over. Reported per scenario (median over ``--repeat`` runs):
+
+- ``import_scoring``: importing ``scoring`` and ``model_registry``
+- ``first_prediction``: import + loading the model bundle + one prediction
+- ``import_app``: importing ``dropout_prediction_app`` (Streamlit bare mode)
+
+It also lists which heavy libraries each scenario pulled in.
+
+Usage::
+
+    python benchmarks/startup_benchmark.py --repeat 5 [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['pandas', 'sklearn', 'xgboost', 'streamlit', 'matplotlib', 'seaborn']
+
+_PRELUDE = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+"""
+
+_EPILOGUE = """
+result['total_seconds'] = time.perf_counter() - start
+result['loaded_modules'] = [m for m in %r if m in sys.modules]
+print(json.dumps(result))
+""" % (HEAVY_MODULES,)
+
+SCENARIOS = {
+    'import_scoring': """
+import model_registry, scoring
+result = {}
+""",
+    'first_prediction': """
+import model_registry, scoring
+t_import = time.perf_counter()
+bundle = model_registry.get_model_registry().get()
+t_load = time.perf_counter()
+student = scoring.calculate_derived_features(dict(scoring.EXAMPLE_STUDENT))
+scoring.predict_dropout_risk(student, *bundle.as_tuple())
+t_predict = time.perf_counter()
+result = {
+    'import_seconds': t_import - start,
+    'load_seconds': t_load - t_import,
+    'predict_seconds': t_predict - t_load,
+}
+""",
+    'import_app': """
+import logging
+logging.disable(logging.WARNING)
+import dropout_prediction_app
+result = {}
+""",
+}
+
+
+def run_scenario(code):
+    """Run one scenario in a fresh interpreter and return its JSON result."""
+    completed = subprocess.run([sys.executable, "-c", _PRELUDE + code + _EPILOGUE],
+                               cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first prediction")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Scenario to run (default: all)")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        runs = [run_scenario(SCENARIOS[name]) for _ in range(args.repeat)]
+        summary = {key: statistics.median(run[key] for run in runs)
+                   for key in runs[0] if key.endswith('_seconds')}
+        summary['loaded_modules'] = runs[0]['loaded_modules']
+        results[name] = summary
+
+        timings = ", ".join(f"{key}={value * 1000:.0f} ms"
+                            for key, value in summary.items() if key.endswith('_seconds'))
+        print(f"{name:18s} {timings}")
+        print(f"{'':18s} heavy modules: {', '.join(summary['loaded_modules']) or '-'}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
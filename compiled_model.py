@@ -0,0 +1,385 @@
+"""
+Compiled, framework-free inference for the XGBoost dropout model.
+
+``export_compiled_model`` flattens the trained booster into complete binary
+trees stored as plain NumPy arrays (heap layout: the children of node ``i``
+are ``2i+1`` and ``2i+2``) and writes them, together with the encoder
+classes and the scaler mean/scale vectors, to a single ``.npz`` file.
+``CompiledModel`` evaluates those arrays with vectorized NumPy only; neither
+xgboost nor scikit-learn is imported at inference time.
+
+Probabilities are bit-identical to ``XGBClassifier.predict_proba``: features
+are compared in float32, leaf values are accumulated in float32 in tree
+order starting from the base margin, and the sigmoid uses ``expf``, a NumPy
+port of the glibc ``expf`` that XGBoost's sigmoid calls. The parity check
+compares both models on the rows of ``data.csv`` and on random feature
+matrices. The random rows include values far outside the training range and
+missing values.
+
+Usage::
+
+    python compiled_model.py export            # writes model/compiled_model.npz, then checks it
+    python compiled_model.py check             # parity check against the joblib model
+"""
+import argparse
+import json
+import os
+import sys
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+from model_registry import MODEL_DIR, ModelBundle, get_model_registry
+
+COMPILED_MODEL_FILE = "compiled_model.npz"
+
+FORMAT_VERSION = 1
+
+
+# glibc's expf (used by XGBoost's sigmoid) in double precision: 2^(k/32) from
+# a table times a cubic in the remainder, rounded once to float32. It is not
+# correctly rounded, so rounding float64 exp to float32 differs from it by
+# 1 ulp on about 1 in 1500 inputs.
+_EXPF_TABLE_BITS = 5
+_EXPF_N = 1 << _EXPF_TABLE_BITS
+_EXPF_INV_LN2_N = float.fromhex('0x1.71547652b82fep+0') * _EXPF_N
+_EXPF_SHIFT = float.fromhex('0x1.8p+52')
+_EXPF_POLY = (float.fromhex('0x1.c6af84b912394p-5') / _EXPF_N ** 3,
+              float.fromhex('0x1.ebfce50fac4f3p-3') / _EXPF_N ** 2,
+              float.fromhex('0x1.62e42ff0c52d6p-1') / _EXPF_N)
+_EXPF_OVERFLOW = np.float32(float.fromhex('0x1.62e42ep6'))
+_EXPF_UNDERFLOW = np.float32(float.fromhex('-0x1.9fe368p6'))
+
+
+def _expf_table():
+    # Correctly rounded 2^(i/N), with i/N already folded into the exponent bits
+    with localcontext() as context:
+        context.prec = 50
+        ln2 = Decimal(2).ln()
+        powers = np.array([float((ln2 * i / _EXPF_N).exp()) for i in range(_EXPF_N)])
+    shift = np.uint64(52 - _EXPF_TABLE_BITS)
+    return powers.view(np.uint64) - (np.arange(_EXPF_N, dtype=np.uint64) << shift)
+
+
+_EXPF_TABLE = _expf_table()
+
+
+def expf(x):
+    """Elementwise float32 ``exp`` that rounds exactly like glibc's ``expf``."""
+    x = np.asarray(x, dtype=np.float32)
+    z = _EXPF_INV_LN2_N * np.clip(x, _EXPF_UNDERFLOW, _EXPF_OVERFLOW).astype(np.float64)
+    kd = z + _EXPF_SHIFT
+    ki = kd.view(np.uint64)
+    r = z - (kd - _EXPF_SHIFT)
+    s = (_EXPF_TABLE[ki & np.uint64(_EXPF_N - 1)]
+         + (ki << np.uint64(52 - _EXPF_TABLE_BITS))).view(np.float64)
+    y = (_EXPF_POLY[0] * r + _EXPF_POLY[1]) * (r * r) + (_EXPF_POLY[2] * r + 1.0)
+    y = (y * s).astype(np.float32)
+    y[x > _EXPF_OVERFLOW] = np.inf
+    y[x < _EXPF_UNDERFLOW] = 0.0
+    return y
+
+
+class ArrayLabelEncoder:
+    """Minimal ``LabelEncoder`` replacement backed by a plain ``classes_`` array."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._index = {label: code for code, label in enumerate(self.classes_.tolist())}
+
+    def transform(self, values):
+        try:
+            return np.array([self._index[value] for value in values], dtype=np.int64)
+        except (KeyError, TypeError):
+            raise ValueError(f"y contains previously unseen labels: {list(values)}")
+
+
+class ArrayScaler:
+    """Minimal ``StandardScaler`` replacement backed by ``mean_`` and ``scale_`` arrays."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def _tree_depth(tree, node=0):
+    """Depth of the subtree rooted at ``node`` of an XGBoost JSON tree."""
+    left = tree['left_children'][node]
+    if left < 0:
+        return 0
+    return 1 + max(_tree_depth(tree, left), _tree_depth(tree, tree['right_children'][node]))
+
+
+def _flatten_trees(trees, depth):
+    """Convert XGBoost JSON trees into heap-layout split and leaf arrays."""
+    n_trees = len(trees)
+    width = 2 ** depth
+    n_internal = width - 1
+    split_feature = np.zeros((n_trees, n_internal), dtype=np.int32)
+    split_value = np.full((n_trees, n_internal), np.inf, dtype=np.float32)
+    default_left = np.ones((n_trees, n_internal), dtype=bool)
+    leaf_value = np.zeros((n_trees, width), dtype=np.float32)
+
+    for t, tree in enumerate(trees):
+        stack = [(0, 0, 0)]  # (tree node, heap position, level)
+        while stack:
+            node, pos, level = stack.pop()
+            left = tree['left_children'][node]
+            if left < 0:
+                # Early leaf: every bottom-level descendant gets its value,
+                # the padding splits above them keep their +inf defaults
+                first = (pos + 1) * 2 ** (depth - level) - 1 - n_internal
+                leaf_value[t, first:first + 2 ** (depth - level)] = tree['split_conditions'][node]
+                continue
+            split_feature[t, pos] = tree['split_indices'][node]
+            split_value[t, pos] = tree['split_conditions'][node]
+            default_left[t, pos] = bool(tree['default_left'][node])
+            stack.append((left, 2 * pos + 1, level + 1))
+            stack.append((tree['right_children'][node], 2 * pos + 2, level + 1))
+
+    return split_feature, split_value, default_left, leaf_value
+
+
+def compile_booster(booster):
+    """
+    Flatten an XGBoost binary:logistic booster into NumPy arrays.
+
+    Returns:
+    --------
+    dict
+        Arrays accepted by :class:`CompiledModel`
+    """
+    config = json.loads(bytes(booster.save_raw("json")))
+    learner = config['learner']
+    objective = learner['objective']['name']
+    if objective != "binary:logistic":
+        raise ValueError(f"Only binary:logistic boosters can be compiled, got {objective}")
+    trees = learner['gradient_booster']['model']['trees']
+    if any(tree['categories'] for tree in trees):
+        raise ValueError("Boosters with categorical splits cannot be compiled")
+
+    base_score = np.float32(float(learner['learner_model_param']['base_score'].strip("[]")))
+    depth = max(_tree_depth(tree) for tree in trees)
+    split_feature, split_value, default_left, leaf_value = _flatten_trees(trees, depth)
+    return {
+        'base_score': np.array(base_score, dtype=np.float32),
+        'split_feature': split_feature,
+        'split_value': split_value,
+        'default_left': default_left,
+        'leaf_value': leaf_value,
+    }
+
+
+class CompiledModel:
+    """
+    NumPy evaluator for a compiled booster with the ``predict``/``predict_proba`` API.
+
+    Rows are evaluated in blocks of ``block_size`` to keep the working set of
+    the per-level gathers in cache.
+    """
+
+    def __init__(self, base_score, split_feature, split_value, default_left, leaf_value,
+                 block_size=2048):
+        self.split_feature = split_feature
+        self.split_value = split_value
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.block_size = block_size
+        self.n_trees, width = leaf_value.shape
+        self.depth = int(width).bit_length() - 1
+        # Same margin transform as XGBoost's ProbToMargin, in float32
+        base_score = np.float32(base_score)
+        self.base_margin = np.float32(-np.log(np.float32(1.0) / base_score - np.float32(1.0)))
+        self.classes_ = np.array([0, 1])
+        self._internal_offset = (np.arange(self.n_trees) * split_value.shape[1])[None, :]
+        self._leaf_offset = (np.arange(self.n_trees) * width)[None, :]
+        self._split_feature = split_feature.ravel()
+        self._split_value = split_value.ravel()
+        self._default_left = default_left.ravel()
+        self._leaf_value = leaf_value.ravel()
+
+    def _margin(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows) * n_features)[:, None]
+        pos = np.zeros((n_rows, self.n_trees), dtype=np.intp)
+        for _ in range(self.depth):
+            node = pos + self._internal_offset
+            value = flat[row_offset + self._split_feature[node]]
+            go_left = np.where(np.isnan(value), self._default_left[node],
+                               value < self._split_value[node])
+            pos = 2 * pos + 2 - go_left
+        leaves = np.empty((n_rows, self.n_trees + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_margin
+        leaves[:, 1:] = self._leaf_value[pos - (2 ** self.depth - 1) + self._leaf_offset]
+        # cumsum adds strictly left to right, like XGBoost's per-tree accumulation
+        return np.cumsum(leaves, axis=1, dtype=np.float32)[:, -1]
+
+    def predict_margin(self, X):
+        """Return the raw float32 margins for ``X``."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        margins = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), self.block_size):
+            margins[start:start + self.block_size] = self._margin(X[start:start + self.block_size])
+        return margins
+
+    def predict_proba(self, X):
+        """Return ``[[P(Dropout), P(Graduate)], ...]`` like ``XGBClassifier.predict_proba``."""
+        margin = self.predict_margin(X)
+        positive = np.float32(1.0) / (expf(-margin) + np.float32(1.0))
+        return np.vstack((np.float32(1.0) - positive, positive)).T
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+
+def export_compiled_model(model_dir=MODEL_DIR, output_path=None):
+    """
+    Compile the joblib bundle in ``model_dir`` into a single ``.npz`` artifact.
+
+    Returns:
+    --------
+    str
+        Path of the written artifact
+    """
+    if output_path is None:
+        output_path = os.path.join(model_dir, COMPILED_MODEL_FILE)
+    bundle = get_model_registry(model_dir).get()
+    if bundle.model is None:
+        raise ValueError(f"No model found in {model_dir}")
+
+    arrays = compile_booster(bundle.model.get_booster())
+    arrays['format_version'] = np.array(FORMAT_VERSION)
+    arrays['source_version'] = np.array(bundle.version)
+    arrays['feature_names'] = np.array(bundle.feature_names)
+    arrays['categorical_features'] = np.array(sorted(bundle.encoders))
+    for feature, encoder in bundle.encoders.items():
+        arrays[f'classes_{feature}'] = np.asarray(encoder.classes_).astype(str)
+    arrays['scaler_mean'] = np.asarray(bundle.scaler.mean_, dtype=np.float64)
+    arrays['scaler_scale'] = np.asarray(bundle.scaler.scale_, dtype=np.float64)
+
+    np.savez(output_path, **arrays)
+    return output_path
+
+
+def load_compiled_bundle(path=os.path.join(MODEL_DIR, COMPILED_MODEL_FILE)):
+    """
+    Load a compiled artifact as a :class:`ModelBundle` (NumPy only, no pickles).
+
+    ``path`` may also be a packaged ``model_artifact.py`` file; its tree
+    arrays are then memory-mapped and shared between processes.
+    """
+    from model_artifact import is_packaged_artifact, load_artifact
+
+    if is_packaged_artifact(path):
+        return load_artifact(path, engine="compiled")
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['format_version']) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format in {path}")
+        model = CompiledModel(data['base_score'], data['split_feature'], data['split_value'],
+                              data['default_left'], data['leaf_value'])
+        encoders = {feature: ArrayLabelEncoder(data[f'classes_{feature}'])
+                    for feature in data['categorical_features'].tolist()}
+        scaler = ArrayScaler(data['scaler_mean'], data['scaler_scale'])
+        return ModelBundle(model, data['feature_names'].tolist(), encoders, scaler,
+                           version=str(data['source_version']))
+
+
+def random_feature_matrix(model, n_features, n_rows=100000, seed=0):
+    """
+    Random model inputs for parity checks, beyond what ``data.csv`` covers.
+
+    Most values are standard-normal (the scaled training range). The rest
+    are values far outside that range (up to +-1e30), exact split
+    thresholds of ``model`` (a :class:`CompiledModel`) and missing values.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0.0, 2.0, (n_rows, n_features)).astype(np.float32)
+    draw = rng.random(X.shape)
+    wide = draw < 0.10
+    X[wide] = rng.uniform(-1e4, 1e4, np.count_nonzero(wide))
+    extreme = draw > 0.98
+    X[extreme] = rng.choice(np.float32([-1e30, -1e10, 1e10, 1e30]), np.count_nonzero(extreme))
+    for feature in range(n_features):
+        thresholds = model.split_value[(model.split_feature == feature)
+                                       & np.isfinite(model.split_value)]
+        on_split = (draw[:, feature] >= 0.10) & (draw[:, feature] < 0.25)
+        if len(thresholds):
+            X[on_split, feature] = rng.choice(thresholds, np.count_nonzero(on_split))
+    X[(draw >= 0.25) & (draw < 0.30)] = np.nan
+    return X
+
+
+def count_mismatches(expected_model, actual_model, X):
+    """Number of rows of ``X`` whose probabilities differ between the two models."""
+    expected = expected_model.predict_proba(X)
+    actual = actual_model.predict_proba(X)
+    return int(np.count_nonzero((expected != actual).any(axis=1)))
+
+
+def check_parity(compiled_path, model_dir=MODEL_DIR, data_path="data.csv", random_rows=100000):
+    """
+    Compare compiled and joblib probabilities on every row of ``data_path``
+    and on ``random_rows`` rows of :func:`random_feature_matrix`.
+
+    Returns:
+    --------
+    dict
+        Number of rows whose probabilities are not bit-identical, for
+        ``data`` and ``random``
+    """
+    from scoring import build_feature_matrix, calculate_derived_features_batch, read_student_csv
+
+    reference = get_model_registry(model_dir).get()
+    compiled = load_compiled_bundle(compiled_path)
+    if compiled.version != reference.version:
+        raise ValueError("Compiled artifact was exported from a different model bundle")
+
+    students = calculate_derived_features_batch(read_student_csv(data_path))
+    X = build_feature_matrix(students, reference.feature_names, reference.encoders,
+                             reference.scaler)
+    X_compiled = build_feature_matrix(students, compiled.feature_names, compiled.encoders,
+                                      compiled.scaler)
+    X_random = random_feature_matrix(compiled.model, len(compiled.feature_names), random_rows)
+    return {
+        'data': (count_mismatches(reference.model, compiled.model, X)
+                 if np.array_equal(X, X_compiled) else len(X)),
+        'random': count_mismatches(reference.model, compiled.model, X_random),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or check the compiled model artifact")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--output", help="Compiled artifact path (default: <model-dir>/compiled_model.npz)")
+    parser.add_argument("--data", default="data.csv", help="Rows used by the parity check")
+    parser.add_argument("--random-rows", type=int, default=100000,
+                        help="Random and out-of-range rows added to the parity check")
+    args = parser.parse_args()
+
+    path = args.output or os.path.join(args.model_dir, COMPILED_MODEL_FILE)
+    if args.command == "export":
+        path = export_compiled_model(args.model_dir, path)
+        print(f"Compiled model written to {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+
+    # Every export is checked too, so a drifting artifact is never left unnoticed
+    mismatches = check_parity(path, args.model_dir, args.data, args.random_rows)
+    if any(mismatches.values()):
+        print(f"Parity check FAILED: {mismatches['data']} rows of {args.data} and "
+              f"{mismatches['random']} random rows differ from the joblib model")
+        sys.exit(1)
+    print(f"Parity check passed: probabilities are bit-identical to the joblib model "
+          f"on {args.data} and {args.random_rows} random rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import joblib
+import concurrent.futures
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+import time
+import instrumentation
+from explanations import explain_batch, importance_is_current, load_global_importance, supports_explanations
+from model_evaluation import load_report, report_is_current
+from model_registry import CATEGORICAL_FEATURES, get_model_registry
+from prediction_cache import get_prediction_cache
+from rendering import render_confusion_matrix, render_gauge
+from scoring import (calculate_derived_features, read_student_csv, predict_dropout_risk_batch,
+                     scored_to_csv_bytes, RESULT_COLUMNS)
+from scoring_queue import ScoringQueueFull, get_scoring_queue
+from what_if import WHAT_IF_VALUES, rank_sensitivity, sensitivity_grid, sensitivity_sweep
 
 # Set page configuration
 st.set_page_config(
@@ -15,6 +22,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Size and time-to-live (seconds) of the shared prediction cache
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 1024))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 3600))
+
+# Seconds a form submission waits for its result from the shared scoring queue
+SCORING_TIMEOUT = float(os.environ.get("SCORING_TIMEOUT", 30))
+
 # Create directories if they don't exist
 if not os.path.exists("model"):
     os.makedirs("model")
@@ -23,175 +37,19 @@ def load_encoders_and_model():
     """
     Load the model, encoders, and scaler if they exist.
     If not, provide default versions for demonstration.
-    """
-    # Default model and encoders (for demonstration if files not found)
-    model = None
-    feature_names = None
-    encoders = {}
-    scaler = None
-    
-    try:
-        # Try to load model and feature names
-        model_files = [f for f in os.listdir("model") if f.endswith("_model.joblib")]
-        if model_files:
-            model = joblib.load(f"model/{model_files[0]}")
-            feature_names = joblib.load("model/feature_names.joblib")
-        
-        # Load encoders for categorical features
-        categorical_features = ['Gender', 'Scholarship_holder', 'Debtor', 
-                              'Tuition_fees_up_to_date', 'Displaced', 
-                              'Daytime_evening_attendance']
-        
-        for feature in categorical_features:
-            encoder_path = f"model/encoder_{feature}.joblib"
-            if os.path.exists(encoder_path):
-                encoders[feature] = joblib.load(encoder_path)
-            else:
-                # Create default encoder
-                encoders[feature] = LabelEncoder()
-                if feature == 'Gender':
-                    encoders[feature].classes_ = np.array(['Male', 'Female'])
-                else:
-                    encoders[feature].classes_ = np.array(['No', 'Yes'])
-                if feature == 'Daytime_evening_attendance':
-                    encoders[feature].classes_ = np.array(['Evening', 'Daytime'])
-        
-        # Load scaler
-        scaler_path = "model/scaler_numerical_features.joblib"
-        if os.path.exists(scaler_path):
-            scaler = joblib.load(scaler_path)
-        else:
-            scaler = StandardScaler()
-        
-    except Exception as e:
-        st.error(f"Error loading model components: {e}")
-    
-    return model, feature_names, encoders, scaler
 
-def predict_dropout_risk(student_data, model, feature_names, encoders, scaler):
-    """
-    Predict the risk of a student dropping out.
-    
-    Parameters:
-    -----------
-    student_data : dict
-        Dictionary containing student features
-    model : sklearn model
-        Loaded prediction model
-    feature_names : list
-        List of feature names in the correct order
-    encoders : dict
-        Dictionary of label encoders for categorical features
-    scaler : sklearn scaler
-        Scaler for numerical features
-    
-    Returns:
-    --------
-    dict
-        Prediction results including probability and risk level
+    The bundle is loaded once per process by the shared model registry and
+    only reloaded when the artifact files in ``model/`` change. Cached
+    predictions of an older bundle version are dropped at the same time.
     """
-    if model is None:
-        return {
-            'dropout_probability': 0.5,
-            'graduate_probability': 0.5,
-            'predicted_status': 'Demo Mode - No Model Loaded',
-            'risk_level': 'Medium'
-        }
-    
-    # Prepare the input data
-    input_data = []
-    
-    # Encode categorical features
-    categorical_features = ['Gender', 'Scholarship_holder', 'Debtor', 
-                          'Tuition_fees_up_to_date', 'Displaced', 
-                          'Daytime_evening_attendance']
+    bundle = get_model_registry().get()
+    if bundle.error is not None:
+        st.error(f"Error loading model components: {bundle.error}")
+    get_prediction_cache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL).ensure_version(bundle.version)
     
-    for feature in categorical_features:
-        if feature in student_data and feature in encoders:
-            try:
-                student_data[feature] = encoders[feature].transform([student_data[feature]])[0]
-            except:
-                # Default to 0 if transformation fails
-                student_data[feature] = 0
-    
-    # Scale numerical features
-    numerical_features = [f for f in feature_names if f not in categorical_features]
-    if len(numerical_features) > 0 and scaler is not None:
-        numerical_values = [student_data.get(f, 0) for f in numerical_features]
-        try:
-            scaled_values = scaler.transform([numerical_values])[0]
-            for i, feature in enumerate(numerical_features):
-                student_data[feature] = scaled_values[i]
-        except:
-            # Use unscaled values if transformation fails
-            pass
-    
-    # Create the input array in the correct order
-    for feature in feature_names:
-        input_data.append(student_data.get(feature, 0))
-    
-    # Make prediction
-    input_array = np.array([input_data])
-    
-    # Predict both class and probability
-    prediction = model.predict(input_array)[0]
-    probability = model.predict_proba(input_array)[0]
-    
-    # Interpret the results
-    result = {
-        'dropout_probability': float(probability[0]),
-        'graduate_probability': float(probability[1]),
-        'predicted_status': 'Dropout' if prediction == 0 else 'Graduate',
-        'risk_level': 'High' if probability[0] > 0.7 else 'Medium' if probability[0] > 0.3 else 'Low'
-    }
-    
-    return result
-
-def calculate_derived_features(data):
-    """Calculate derived features from the input data"""
-    # Average grade across semesters
-    data['avg_grade'] = (data['Curricular_units_1st_sem_grade'] + 
-                         data['Curricular_units_2nd_sem_grade']) / 2
-    
-    # Total approved units
-    data['total_approved_units'] = (data['Curricular_units_1st_sem_approved'] + 
-                                   data['Curricular_units_2nd_sem_approved'])
-    
-    # Total enrolled units
-    data['total_enrolled_units'] = (data['Curricular_units_1st_sem_enrolled'] + 
-                                   data['Curricular_units_2nd_sem_enrolled'])
-    
-    # Pass rate
-    if data['total_enrolled_units'] > 0:
-        data['pass_rate'] = (data['total_approved_units'] / 
-                            data['total_enrolled_units']) * 100
-    else:
-        data['pass_rate'] = 0
-    
-    # Grade improvement
-    data['grade_improvement'] = (data['Curricular_units_2nd_sem_grade'] - 
-                                data['Curricular_units_1st_sem_grade'])
-    
-    # Performance drop indicator
-    data['performance_drop'] = int((data['Curricular_units_2nd_sem_approved'] < 
-                                  data['Curricular_units_1st_sem_approved']) and 
-                                 (data['Curricular_units_2nd_sem_grade'] < 
-                                  data['Curricular_units_1st_sem_grade']))
-    
-    # Approval rates
-    if data['Curricular_units_1st_sem_enrolled'] > 0:
-        data['approval_rate_1st_sem'] = data['Curricular_units_1st_sem_approved'] / data['Curricular_units_1st_sem_enrolled']
-    else:
-        data['approval_rate_1st_sem'] = 0
-        
-    if data['Curricular_units_2nd_sem_enrolled'] > 0:
-        data['approval_rate_2nd_sem'] = data['Curricular_units_2nd_sem_approved'] / data['Curricular_units_2nd_sem_enrolled']
-    else:
-        data['approval_rate_2nd_sem'] = 0
-    
-    return data
+    return bundle.as_tuple()
 
-def display_prediction_results(prediction):
+def display_prediction_results(prediction, input_values=None):
     """Display the prediction results in a visually appealing way"""
     # Create columns for layout
     col1, col2 = st.columns(2)
@@ -217,42 +75,10 @@ def display_prediction_results(prediction):
     with col2:
         st.subheader("Dropout Probability")
         
-        # Create and display gauge chart using matplotlib
-        fig, ax = plt.subplots(figsize=(4, 3))
-        
-        # Gauge chart settings
+        # Display the gauge; only the pointer is drawn per prediction on a cached background
         dropout_prob = prediction['dropout_probability']
-        gauge_colors = ['green', 'yellow', 'orange', 'red']
-        
-        # Create gauge segments
-        ax.barh(0, 100, color='lightgray', height=0.5)
-        
-        # Add colored segments
-        segment_width = 25
-        for i, color in enumerate(gauge_colors):
-            ax.barh(0, segment_width, left=i*segment_width, color=color, height=0.5, alpha=0.7)
-        
-        # Add pointer
-        pointer_pos = dropout_prob * 100
-        ax.plot([pointer_pos, pointer_pos], [-0.5, 0.5], color='black', linewidth=3)
-        ax.plot([pointer_pos-3, pointer_pos, pointer_pos+3], [-0.5, 0, -0.5], color='black')
-        
-        # Format plot
-        ax.set_xlim(0, 100)
-        ax.set_ylim(-1, 1)
-        ax.set_yticks([])
-        ax.set_xticks([0, 25, 50, 75, 100])
-        ax.set_xticklabels(['0%', '25%', '50%', '75%', '100%'])
-        ax.set_title(f"Dropout Probability: {dropout_prob:.1%}")
-        
-        # Remove spines
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-            
-        plt.tight_layout()
-        
-        # Display plot in Streamlit
-        st.pyplot(fig)
+        st.markdown(f"**Dropout Probability: {dropout_prob:.1%}**")
+        st.image(render_gauge(dropout_prob))
     
     # Display detailed probabilities
     st.subheader("Probability Breakdown")
@@ -263,6 +89,131 @@ def display_prediction_results(prediction):
     
     with prob_col2:
         st.metric("Graduate Probability", f"{prediction['graduate_probability']:.1%}")
+    
+    if 'explanation' in prediction:
+        display_explanation(prediction['explanation'], input_values or {})
+
+def display_explanation(explanation, input_values, n_factors=8):
+    """Show the features that pushed this student's prediction towards or away from dropout"""
+    st.subheader("Why This Prediction?")
+    factors = explanation['contributions'][:n_factors]
+    st.bar_chart({'Factor': [feature for feature, _ in factors],
+                  'Effect on dropout risk (log-odds)': [value for _, value in factors]},
+                 x='Factor', y='Effect on dropout risk (log-odds)', height=260)
+    for feature, value in factors[:4]:
+        shown = input_values.get(feature)
+        shown = f" = {shown:g}" if isinstance(shown, (int, float)) else f" = {shown}" if shown is not None else ""
+        effect = "raises" if value > 0 else "lowers"
+        st.markdown(f"- **{feature}**{shown} {effect} the dropout risk ({value:+.2f})")
+
+# Reruns only the what-if section when its widgets change
+# (st.experimental_fragment on older Streamlit versions)
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+@_fragment
+def display_what_if(student, model, feature_names, encoders, scaler):
+    """Show how the dropout probability responds to changing each input of the submitted student"""
+    st.subheader("What-if Analysis")
+    st.caption("Each input is varied over its full range while the others keep the submitted values.")
+    
+    start = time.perf_counter()
+    sweep = sensitivity_sweep(student, model, feature_names, encoders, scaler)
+    scoring_seconds = time.perf_counter() - start
+    ranking = rank_sensitivity(sweep)
+    n_points = sum(len(curve['values']) for curve in sweep['curves'].values())
+    
+    st.dataframe([
+        {'Input': row['feature'],
+         'Current': str(student[row['feature']]),
+         'Lowest risk': f"{row['min_probability']:.1%}",
+         'Highest risk': f"{row['max_probability']:.1%}",
+         'Lowest-risk value': str(row['best_value'])}
+        for row in ranking
+    ], hide_index=True)
+    
+    selected = st.multiselect("Inputs to plot", [row['feature'] for row in ranking],
+                              default=[row['feature'] for row in ranking[:4]])
+    chart_cols = st.columns(2)
+    for i, feature in enumerate(selected):
+        curve = sweep['curves'][feature]
+        chart_data = {feature: curve['values'], 'Dropout probability': curve['dropout_probability']}
+        with chart_cols[i % 2]:
+            st.markdown(f"**{feature}** (now: {student[feature]})")
+            if feature in CATEGORICAL_FEATURES:
+                st.bar_chart(chart_data, x=feature, y='Dropout probability', height=220)
+            else:
+                st.line_chart(chart_data, x=feature, y='Dropout probability', height=220)
+    
+    with st.expander("Combine two inputs"):
+        numeric_inputs = [f for f in WHAT_IF_VALUES if f not in CATEGORICAL_FEATURES]
+        few_valued = [f for f in WHAT_IF_VALUES if len(WHAT_IF_VALUES[f]) <= 11]
+        feature_x = st.selectbox("Horizontal axis", numeric_inputs,
+                                 index=numeric_inputs.index('Curricular_units_2nd_sem_grade'))
+        line_inputs = [f for f in few_valued if f != feature_x]
+        feature_y = st.selectbox("One line per value of", line_inputs,
+                                 index=line_inputs.index('Curricular_units_2nd_sem_approved')
+                                 if 'Curricular_units_2nd_sem_approved' in line_inputs else 0)
+        start = time.perf_counter()
+        values_x, values_y, grid = sensitivity_grid(student, feature_x, feature_y, model,
+                                                    feature_names, encoders, scaler)
+        scoring_seconds += time.perf_counter() - start
+        n_points += grid.size
+        grid_data = {feature_x: values_x}
+        for j, value in enumerate(values_y):
+            grid_data[f"{feature_y} = {value}"] = grid[j]
+        st.line_chart(grid_data, x=feature_x, height=300)
+    
+    st.caption(f"{n_points:,} what-if predictions scored in {scoring_seconds * 1000:.0f} ms")
+
+def display_batch_prediction(model, feature_names, encoders, scaler):
+    """Score an uploaded cohort CSV and offer the results for download"""
+    st.header("Batch Prediction")
+    st.markdown("""
+    Upload a CSV with one student per row to score a whole cohort at once. Both the raw
+    `data.csv` format (separated by `;`, integer codes) and comma-separated files with the
+    same labels as the prediction form are supported.
+    """)
+    
+    uploaded_file = st.file_uploader("Student CSV", type=["csv"])
+    if uploaded_file is None:
+        return
+    
+    try:
+        students = read_student_csv(uploaded_file)
+    except Exception as e:
+        st.error(f"Could not read the uploaded file: {e}")
+        return
+    
+    if model is None or feature_names is None:
+        st.error("Cannot make prediction: Model or feature names not loaded properly.")
+        return
+    
+    explain = supports_explanations(model) and st.checkbox(
+        "Explain each prediction (top risk factors per student)",
+        help="Adds the per-feature contributions; takes about 0.4 ms per student")
+    
+    scored = predict_dropout_risk_batch(students, model, feature_names, encoders, scaler)
+    shown_columns = list(students.columns) + RESULT_COLUMNS
+    if explain:
+        explained = explain_batch(scored, model, feature_names, encoders, scaler)
+        scored = scored.join(explained)
+        shown_columns.append('top_risk_factors')
+    
+    # Summary of the cohort
+    risk_counts = scored['risk_level'].value_counts()
+    sum_col1, sum_col2, sum_col3, sum_col4 = st.columns(4)
+    with sum_col1:
+        st.metric("Students Scored", len(scored))
+    with sum_col2:
+        st.metric("High Risk", int(risk_counts.get('High', 0)))
+    with sum_col3:
+        st.metric("Medium Risk", int(risk_counts.get('Medium', 0)))
+    with sum_col4:
+        st.metric("Low Risk", int(risk_counts.get('Low', 0)))
+    
+    st.dataframe(scored[shown_columns].head(1000))
+    st.download_button("Download Scored CSV", data=scored_to_csv_bytes(scored),
+                       file_name="scored_students.csv", mime="text/csv")
 
 def main():
     # Load model components
@@ -279,10 +230,11 @@ def main():
     if model is None:
         st.warning("⚠️ No model file found. Running in demonstration mode. Predictions will be random.")
     
-    # Create tabs for different app sections
-    tab1, tab2, tab3 = st.tabs(["Make Prediction", "Model Info", "About"])
+    # Select the app section in the sidebar; only the selected section is rendered,
+    # so the plotting libraries are not imported until a page that needs them is opened
+    page = st.sidebar.radio("Navigation", ["Make Prediction", "Batch Prediction", "Model Info", "About"])
     
-    with tab1:
+    if page == "Make Prediction":
         st.header("Student Information")
         
         # Create form for user input
@@ -344,15 +296,30 @@ def main():
                     'Previous_qualification_grade': prev_qualification
                 }
                 
-                # Calculate derived features
-                student_data = calculate_derived_features(student_data)
+                # Keep the form inputs for the what-if analysis below the form
+                st.session_state['what_if_student'] = dict(student_data)
+                
+                # Calculate derived features (shown next to the explanation)
+                input_values = calculate_derived_features(dict(student_data))
                 
                 # Make prediction
                 if model is not None and feature_names is not None:
-                    prediction = predict_dropout_risk(student_data, model, feature_names, encoders, scaler)
+                    # Scored by the queue shared by all sessions, batched with
+                    # submissions of other users arriving at the same time
+                    try:
+                        prediction = get_scoring_queue().submit(student_data, timeout=SCORING_TIMEOUT)
+                    except ScoringQueueFull:
+                        st.warning("The prediction service is busy right now. Please submit again in a moment.")
+                        st.stop()
+                    except (concurrent.futures.TimeoutError, TimeoutError):
+                        st.error(f"The prediction took longer than {SCORING_TIMEOUT:.0f} seconds. Please submit again.")
+                        st.stop()
+                    except Exception as e:
+                        st.error(f"Prediction failed: {e}")
+                        st.stop()
                     
                     # Display prediction results
-                    display_prediction_results(prediction)
+                    display_prediction_results(prediction, input_values)
                     
                     # Recommendations based on prediction
                     st.subheader("Recommendations")
@@ -385,8 +352,14 @@ def main():
                         """)
                 else:
                     st.error("Cannot make prediction: Model or feature names not loaded properly.")
+        
+        if 'what_if_student' in st.session_state and model is not None and feature_names is not None:
+            display_what_if(st.session_state['what_if_student'], model, feature_names, encoders, scaler)
+    
+    elif page == "Batch Prediction":
+        display_batch_prediction(model, feature_names, encoders, scaler)
     
-    with tab2:
+    elif page == "Model Info":
         st.header("Model Information")
         
         st.subheader("About the Prediction Model")
@@ -403,14 +376,30 @@ def main():
         """)
         
         st.subheader("Key Dropout Risk Factors")
-        st.markdown("""
-        Based on the model's analysis, the following factors have the strongest influence on dropout prediction:
-        
-        1. **Academic Performance**: Low grades and failing courses, especially in the first semester
-        2. **Financial Challenges**: Being a debtor or having unpaid tuition fees
-        3. **Course Management**: Enrolling in many courses but completing few
-        4. **Performance Decline**: Significant drop in performance between semesters
-        """)
+        # Mean TreeSHAP contributions, precomputed offline once per model version
+        importance = load_global_importance()
+        if importance is None:
+            st.info("No feature importance summary available. Run `python explanations.py` to create it.")
+        elif not importance_is_current(importance, get_model_registry().get().version):
+            st.warning("The feature importance summary was computed for a different model version. "
+                       "Run `python explanations.py` to update it.")
+        else:
+            top_features = importance['features'][:10]
+            st.bar_chart({'Feature': [f['feature'] for f in top_features],
+                          'Mean |effect| on dropout risk': [f['mean_abs_contribution'] for f in top_features]},
+                         x='Feature', y='Mean |effect| on dropout risk', height=300)
+            lines = []
+            for i, f in enumerate(importance['features'][:5], start=1):
+                raises = f['direction'] == 'higher_raises_risk'
+                if 'high_value' in f:
+                    lines.append(f"{i}. **{f['feature']}** = {f['high_value']} "
+                                 f"{'raises' if raises else 'lowers'} the dropout risk")
+                else:
+                    lines.append(f"{i}. **{f['feature']}**: higher values "
+                                 f"{'raise' if raises else 'lower'} the dropout risk")
+            st.markdown("\n".join(lines))
+            st.caption(f"Average absolute contribution ({importance['units']}) over "
+                       f"{importance['dataset']['rows']} students of {importance['dataset']['path']}.")
         
         st.subheader("Model Performance")
         st.write("""
@@ -419,22 +408,122 @@ def main():
         and precision (avoiding false alarms).
         """)
         
-        # Create dummy confusion matrix for visualization
-        fig, ax = plt.subplots(figsize=(5, 4))
-        cm = np.array([[85, 15], [10, 90]])  # Dummy confusion matrix
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False, ax=ax)
-        ax.set_xlabel('Predicted')
-        ax.set_ylabel('Actual')
-        ax.set_title('Model Confusion Matrix (Example)')
-        ax.set_xticklabels(['Dropout', 'Graduate'])
-        ax.set_yticklabels(['Dropout', 'Graduate'])
-        plt.tight_layout()
-        
-        st.pyplot(fig)
-        
-        st.caption("Note: This is a sample visualization. Actual model metrics may vary.")
+        # Precomputed offline on the held-out test set; never evaluated while rendering
+        report = load_report()
+        if report is None:
+            st.info("No evaluation report available. Run `python model_evaluation.py` to create it.")
+        elif not report_is_current(report, get_model_registry().get().version):
+            st.warning("The evaluation report was computed for a different model version. "
+                       "Run `python model_evaluation.py` to update it.")
+        else:
+            dropout_metrics = report['classification_report']['Dropout']
+            perf_col1, perf_col2, perf_col3, perf_col4, perf_col5 = st.columns(5)
+            with perf_col1:
+                st.metric("Accuracy", f"{report['accuracy']:.1%}")
+            with perf_col2:
+                st.metric("Dropout Precision", f"{dropout_metrics['precision']:.1%}")
+            with perf_col3:
+                st.metric("Dropout Recall", f"{dropout_metrics['recall']:.1%}")
+            with perf_col4:
+                st.metric("Dropout F1", f"{dropout_metrics['f1']:.3f}")
+            with perf_col5:
+                st.metric("ROC-AUC", f"{report['roc_auc']:.3f}")
+            
+            # Rendered once per model version and served from the cache afterwards
+            cm = np.array(report['confusion_matrix']['matrix'])
+            st.image(render_confusion_matrix(cm, 'Model Confusion Matrix (Test Set)',
+                                             report['model_version']))
+            
+            st.markdown("**Calibration** (predicted vs. observed dropout rate)")
+            st.dataframe([
+                {'Predicted dropout probability': f"{b['lower']:.0%}–{b['upper']:.0%}",
+                 'Students': b['count'],
+                 'Mean predicted': b['mean_predicted'],
+                 'Observed dropout rate': b['observed_rate']}
+                for b in report['calibration']['bins']
+            ], hide_index=True)
+            
+            latency = report['latency']['single_record_ms']
+            st.caption(f"Evaluated on {report['dataset']['test_rows']} held-out students of "
+                       f"{report['dataset']['path']} · Brier score "
+                       f"{report['calibration']['brier_score']:.3f} · single-prediction latency "
+                       f"p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, "
+                       f"p99 {latency['p99']:.2f} ms · generated {report['generated_at']}")
+        
+        st.subheader("Model Loading")
+        registry_stats = get_model_registry().stats()
+        load_col1, load_col2, load_col3 = st.columns(3)
+        with load_col1:
+            st.metric("Bundle Loads", registry_stats['loads'])
+        with load_col2:
+            st.metric("Cache Hits", registry_stats['hits'])
+        with load_col3:
+            last_load = registry_stats['last_load_seconds'] or 0.0
+            st.metric("Last Load Time", f"{last_load * 1000:.0f} ms")
+        if registry_stats['version']:
+            st.caption(f"Model bundle version: {registry_stats['version'][:12]}")
+        
+        st.subheader("Prediction Cache")
+        cache_stats = get_prediction_cache().stats()
+        cache_col1, cache_col2, cache_col3, cache_col4 = st.columns(4)
+        with cache_col1:
+            st.metric("Hits", cache_stats['hits'])
+        with cache_col2:
+            st.metric("Misses", cache_stats['misses'])
+        with cache_col3:
+            st.metric("Evictions", cache_stats['evictions'])
+        with cache_col4:
+            st.metric("Entries", f"{cache_stats['size']} / {cache_stats['maxsize']}")
+        st.caption(f"Hit rate: {cache_stats['hit_rate']:.1%} · "
+                   f"expired: {cache_stats['expirations']} · invalidated: {cache_stats['invalidations']}")
+        
+        st.subheader("Scoring Queue")
+        queue_stats = get_scoring_queue().stats()
+        queue_col1, queue_col2, queue_col3, queue_col4 = st.columns(4)
+        with queue_col1:
+            st.metric("Predictions", queue_stats['scored'])
+        with queue_col2:
+            st.metric("Model Calls", queue_stats['batches'])
+        with queue_col3:
+            st.metric("Mean Batch Size", f"{queue_stats['mean_batch_size']:.1f}")
+        with queue_col4:
+            st.metric("Rejected (Busy)", queue_stats['rejected'])
+        st.caption(f"Pending: {queue_stats['pending']} · largest batch: {queue_stats['max_batch_size_seen']} · "
+                   f"most pending: {queue_stats['max_pending_seen']} · failed: {queue_stats['failed']}")
+        
+        st.subheader("Performance Instrumentation")
+        # Process-wide switches: they apply to every session of this server
+        record_timings = st.checkbox("Record per-stage timings", value=instrumentation.is_enabled())
+        if record_timings and not instrumentation.is_enabled():
+            instrumentation.enable()
+        elif not record_timings and instrumentation.is_enabled():
+            instrumentation.disable()
+        
+        stage_summary = instrumentation.metrics.stage_summary()
+        if stage_summary:
+            st.dataframe([
+                {'Stage': name, 'Calls': s['count'], 'Mean (ms)': round(s['mean_ms'], 3),
+                 'p95 ≤ (ms)': s['p95_ms'], 'Max (ms)': round(s['max_ms'], 3)}
+                for name, s in stage_summary.items()
+            ], hide_index=True)
+        else:
+            st.caption("No timings recorded yet. Enable recording and make some predictions.")
+        with st.expander("Prometheus metrics"):
+            st.code(instrumentation.render_prometheus(), language="text")
+        
+        if instrumentation.profiler_running():
+            if st.button("Stop sampling profiler"):
+                st.session_state['profile'] = instrumentation.stop_profiler()
+                st.rerun()
+            st.caption("The sampling profiler is running.")
+        elif st.button("Start sampling profiler"):
+            instrumentation.start_profiler()
+            st.rerun()
+        if st.session_state.get('profile'):
+            st.download_button("Download profile (collapsed stacks)", st.session_state['profile'],
+                               file_name="profile.collapsed", mime="text/plain")
     
-    with tab3:
+    elif page == "About":
         st.header("About This Application")
         
         st.markdown("""
@@ -445,11 +534,12 @@ def main():
         
         ### How to Use
         
-        1. Enter a student's demographic and academic information in the "Make Prediction" tab
+        1. Enter a student's demographic and academic information in the "Make Prediction" page
         2. Review the prediction results, which include:
            - Probability of dropout
            - Risk level classification
            - Targeted recommendations based on risk level
+        3. To score a whole cohort, upload a CSV in the "Batch Prediction" page and download the scored table
         
         ### Project Background
         
@@ -0,0 +1,242 @@
+"""
+Per-student and global explanations from the booster's own contributions.
+
+XGBoost computes TreeSHAP feature contributions natively
+(``Booster.predict(..., pred_contribs=True)``): for every row, one value per
+feature plus a bias term that add up to the raw margin. The margin is the
+log-odds of class 1 (Graduate), so contributions are negated here and read
+as log-odds *towards dropout*: positive values raise the dropout risk.
+
+- ``explain_row`` explains one encoded and scaled input row (~1 ms); it is
+  used by ``predict_dropout_risk(..., explain=True)``
+- ``explain_batch`` explains a cohort chunk by chunk; the cost is linear in
+  the number of rows (``approximate=True`` uses the much cheaper
+  ``approx_contribs`` path-attribution variant for very large cohorts)
+- ``ensure_global_importance`` keeps ``model/feature_importance.json`` with
+  the mean absolute contribution of every feature on
+  ``df_clean_processed.csv``. Like the evaluation report it is produced
+  offline, by this script or ``python model_artifact.py pack``, and only
+  recomputed when the model content hash changes. The app reads it with
+  ``load_global_importance`` and never runs TreeSHAP over the dataset
+
+Models without a booster (the NumPy compiled model) cannot be explained;
+``supports_explanations`` tells them apart.
+
+Usage::
+
+    python explanations.py            # regenerate the global summary if the model changed
+    python explanations.py --force
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+
+import numpy as np
+
+from model_registry import CATEGORICAL_FEATURES, MODEL_DIR, get_model_registry
+from scoring import DEFAULT_CHUNK_SIZE, build_feature_matrix
+
+IMPORTANCE_FILENAME = "feature_importance.json"
+IMPORTANCE_FORMAT_VERSION = 1
+IMPORTANCE_DATA = "df_clean_processed.csv"
+TOP_FACTORS = 3
+
+_importance_lock = threading.Lock()
+
+
+def supports_explanations(model):
+    """Whether ``model`` exposes an XGBoost booster with native contributions."""
+    return hasattr(model, "get_booster")
+
+
+def contribution_matrix(model, matrix, approximate=False):
+    """
+    Dropout contributions of every row of the model input ``matrix``.
+
+    Returns an ``(n_rows, n_features + 1)`` float64 array in log-odds towards
+    dropout; the last column is the bias (expected value) term.
+    """
+    import xgboost as xgb
+
+    booster = model.get_booster()
+    contributions = booster.predict(xgb.DMatrix(np.asarray(matrix, dtype=np.float64)),
+                                    pred_contribs=True, approx_contribs=approximate)
+    return -np.asarray(contributions, dtype=np.float64)
+
+
+def explain_row(model, feature_names, input_array):
+    """
+    Explain a single encoded and scaled input row.
+
+    Returns:
+    --------
+    dict
+        ``base`` (bias in dropout log-odds) and ``contributions``: a list of
+        ``(feature, contribution)`` pairs ordered by absolute size
+    """
+    contributions = contribution_matrix(model, np.asarray(input_array).reshape(1, -1))[0]
+    return explanation_from_contributions(contributions, feature_names)
+
+
+def explanation_from_contributions(contributions, feature_names):
+    """Build the ``explain_row`` result from one row of ``contribution_matrix``."""
+    order = np.argsort(-np.abs(contributions[:-1]), kind="stable")
+    return {
+        'base': float(contributions[-1]),
+        'contributions': [(feature_names[j], float(contributions[j])) for j in order],
+    }
+
+
+def top_factors_text(contributions, feature_names, n=TOP_FACTORS):
+    """Format the ``n`` features that raise the dropout risk most, e.g. ``"Debtor (+0.84)"``."""
+    order = np.argsort(-contributions, kind="stable")[:n]
+    return ", ".join(f"{feature_names[j]} ({contributions[j]:+.2f})"
+                     for j in order if contributions[j] > 0)
+
+
+def explain_batch(df, model, feature_names, encoders, scaler, chunk_size=DEFAULT_CHUNK_SIZE,
+                  approximate=False):
+    """
+    Explain every student in ``df``.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Records with the derived features, e.g. the output of ``predict_dropout_risk_batch``
+    chunk_size : int
+        Rows per ``pred_contribs`` call
+    approximate : bool
+        Use ``approx_contribs`` instead of exact TreeSHAP
+
+    Returns:
+    --------
+    pandas.DataFrame
+        ``top_risk_factors`` plus one ``contribution_<feature>`` column per
+        model feature, aligned with ``df``
+    """
+    import pandas as pd
+
+    contributions = np.empty((len(df), len(feature_names)), dtype=np.float64)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        matrix = build_feature_matrix(chunk, feature_names, encoders, scaler)
+        contributions[start:start + len(chunk)] = contribution_matrix(model, matrix, approximate)[:, :-1]
+
+    explained = pd.DataFrame(contributions, index=df.index,
+                             columns=[f"contribution_{feature}" for feature in feature_names])
+    explained.insert(0, 'top_risk_factors',
+                     [top_factors_text(row, feature_names) for row in contributions])
+    return explained
+
+
+def importance_path(model_dir=MODEL_DIR):
+    """Path of the global importance summary that belongs to ``model_dir``."""
+    return os.path.join(model_dir, IMPORTANCE_FILENAME)
+
+
+def load_global_importance(model_dir=MODEL_DIR):
+    """Return the saved global importance summary, or ``None``."""
+    path = importance_path(model_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def importance_is_current(summary, version):
+    """Whether ``summary`` was computed with this summary format for the bundle ``version``."""
+    return (summary is not None
+            and summary.get('format_version') == IMPORTANCE_FORMAT_VERSION
+            and summary.get('model_version') == version)
+
+
+def compute_global_importance(bundle, data_path=IMPORTANCE_DATA):
+    """
+    Mean contribution statistics of every feature over the processed dataset.
+
+    ``direction`` is the sign of the correlation between a feature's value
+    and its dropout contribution: ``"higher_raises_risk"`` or
+    ``"higher_lowers_risk"``. For categorical features ``high_value`` names
+    the label encoded as the higher value.
+    """
+    import pandas as pd
+
+    X = pd.read_csv(data_path)[list(bundle.feature_names)].to_numpy(np.float64)
+    contributions = contribution_matrix(bundle.model, X)
+
+    features = []
+    for j, feature in enumerate(bundle.feature_names):
+        values, contribution = X[:, j], contributions[:, j]
+        if values.std() > 0 and contribution.std() > 0:
+            correlation = float(np.corrcoef(values, contribution)[0, 1])
+        else:
+            correlation = 0.0
+        entry = {
+            'feature': feature,
+            'mean_abs_contribution': float(np.abs(contribution).mean()),
+            'mean_contribution': float(contribution.mean()),
+            'direction': 'higher_raises_risk' if correlation > 0 else 'higher_lowers_risk',
+            'correlation': correlation,
+        }
+        if feature in CATEGORICAL_FEATURES and feature in bundle.encoders:
+            entry['high_value'] = str(bundle.encoders[feature].classes_[-1])
+        features.append(entry)
+    features.sort(key=lambda entry: entry['mean_abs_contribution'], reverse=True)
+
+    return {
+        'format_version': IMPORTANCE_FORMAT_VERSION,
+        'model_version': bundle.version,
+        'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        'dataset': {'path': os.path.basename(data_path), 'rows': int(len(X))},
+        'units': 'log-odds towards dropout',
+        'base_value': float(contributions[:, -1].mean()),
+        'features': features,
+    }
+
+
+def ensure_global_importance(model_dir=MODEL_DIR, data_path=IMPORTANCE_DATA, bundle=None,
+                             force=False):
+    """
+    Return the global importance summary of the current model, regenerating it if needed.
+
+    Returns ``None`` when the model cannot be explained, or when the summary
+    is stale and the dataset is not available to rebuild it.
+    """
+    if bundle is None:
+        bundle = get_model_registry(model_dir).get()
+    if bundle.model is None or not supports_explanations(bundle.model):
+        return None
+
+    with _importance_lock:
+        summary = load_global_importance(model_dir)
+        if not force and importance_is_current(summary, bundle.version):
+            return summary
+        if not os.path.exists(data_path):
+            return None
+        summary = compute_global_importance(bundle, data_path)
+        path = importance_path(model_dir)
+        with open(path + ".tmp", "w") as fh:
+            json.dump(summary, fh, indent=2)
+        os.replace(path + ".tmp", path)
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the global feature importance summary")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--data", default=IMPORTANCE_DATA, help="Processed dataset")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the model is unchanged")
+    args = parser.parse_args()
+
+    summary = ensure_global_importance(args.model_dir, args.data, force=args.force)
+    if summary is None:
+        raise SystemExit("No explainable model loaded or no dataset to summarize")
+    print(f"Summary: {importance_path(args.model_dir)} (model {summary['model_version'][:12]})")
+    for entry in summary['features'][:10]:
+        print(f"{entry['feature']:40s} {entry['mean_abs_contribution']:.3f}  {entry['direction']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Typed columnar copies of the datasets, loaded by memory mapping.
+
+``data.csv`` and ``df_clean_processed.csv`` are converted once into a
+directory per dataset under ``feature_store/`` holding one ``.npy`` file
+per column plus a ``_schema.json``. Dtypes are downcast on conversion:
+
+- integer columns get the smallest integer type that holds their range
+  (``int8`` for the binary flags such as ``Debtor`` and ``Gender`` and for
+  most codes, ``int16`` for ``Course``)
+- float columns (grades, rates, scaled features) become ``float32``, the
+  precision XGBoost evaluates in anyway
+- text columns (``Status`` in data.csv) become ``int8`` category codes
+
+Loading memory-maps the ``.npy`` files (``np.load(mmap_mode="r")``), so it
+costs a few file opens instead of parsing text, and only the requested
+columns are opened. The store records the size and mtime of its source CSV
+and ``ensure_store`` rebuilds it when the CSV changes. Only NumPy is needed.
+
+Usage::
+
+    python feature_store.py convert          # build the stores for both datasets
+    python feature_store.py report           # load time and memory vs. pd.read_csv
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import time
+
+import numpy as np
+
+from scoring import detect_separator, read_student_csv
+
+FEATURE_STORE_DIR = "feature_store"
+SCHEMA_FILE = "_schema.json"
+STORE_FORMAT_VERSION = 1
+DATASETS = ["data.csv", "df_clean_processed.csv"]
+
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def store_path(csv_path, store_dir=FEATURE_STORE_DIR):
+    """Directory of the columnar store that belongs to ``csv_path``."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_dir, name)
+
+
+def _source_signature(csv_path):
+    st = os.stat(csv_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def downcast_column(values, float_dtype=np.float32):
+    """
+    Return ``(array, categories)`` with the most compact dtype for ``values``.
+
+    ``categories`` is the list of labels for text columns (the array then
+    holds the codes) and ``None`` otherwise.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "iub":
+        if values.size == 0:
+            return values.astype(np.int8), None
+        low, high = int(values.min()), int(values.max())
+        for int_type in _INT_TYPES:
+            info = np.iinfo(int_type)
+            if info.min <= low and high <= info.max:
+                return values.astype(int_type), None
+    if values.dtype.kind == "f":
+        return values.astype(float_dtype), None
+
+    categories, codes = np.unique(values.astype(str), return_inverse=True)
+    code_type = np.int8 if len(categories) <= np.iinfo(np.int8).max else np.int32
+    return codes.astype(code_type), categories.tolist()
+
+
+def convert_csv(csv_path, store_dir=FEATURE_STORE_DIR, float_dtype=np.float32):
+    """
+    Convert ``csv_path`` (``;`` or ``,`` separated) into a columnar store.
+
+    The store is written to a temporary directory and moved into place, so a
+    reader never sees a half-written store. Returns the store directory.
+    """
+    df = read_student_csv(csv_path)
+    path = store_path(csv_path, store_dir)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        array, categories = downcast_column(df[name].to_numpy(), float_dtype)
+        filename = f"{i:03d}.npy"
+        np.save(os.path.join(tmp_path, filename), array)
+        columns.append({
+            'name': name,
+            'file': filename,
+            'dtype': array.dtype.str,
+            'source_dtype': str(df[name].dtype),
+            'categories': categories,
+        })
+
+    with open(os.path.join(tmp_path, SCHEMA_FILE), "w") as fh:
+        json.dump({
+            'format_version': STORE_FORMAT_VERSION,
+            'source': os.path.basename(csv_path),
+            'source_signature': _source_signature(csv_path),
+            'rows': len(df),
+            'columns': columns,
+        }, fh, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_schema(path):
+    with open(os.path.join(path, SCHEMA_FILE)) as fh:
+        return json.load(fh)
+
+
+def is_current(csv_path, store_dir=FEATURE_STORE_DIR):
+    """Whether the store of ``csv_path`` exists and was built from its current contents."""
+    path = store_path(csv_path, store_dir)
+    if not os.path.exists(os.path.join(path, SCHEMA_FILE)):
+        return False
+    schema = read_schema(path)
+    return (schema.get('format_version') == STORE_FORMAT_VERSION
+            and schema.get('source_signature') == _source_signature(csv_path))
+
+
+def ensure_store(csv_path, store_dir=FEATURE_STORE_DIR):
+    """Return the store directory of ``csv_path``, (re)building it if it is missing or stale."""
+    if not is_current(csv_path, store_dir):
+        return convert_csv(csv_path, store_dir)
+    return store_path(csv_path, store_dir)
+
+
+def load_columns(path, columns=None):
+    """
+    Memory-map the columns of a store.
+
+    Parameters:
+    -----------
+    path : str
+        Store directory (see ``store_path``)
+    columns : list, optional
+        Column names to open (default: all, in the original order)
+
+    Returns:
+    --------
+    tuple
+        ``(arrays, categories)``: dicts from column name to the read-only
+        memory-mapped array, and to the category labels of text columns
+    """
+    schema = read_schema(path)
+    by_name = {column['name']: column for column in schema['columns']}
+    if columns is None:
+        columns = [column['name'] for column in schema['columns']]
+    missing = [name for name in columns if name not in by_name]
+    if missing:
+        raise KeyError(f"Columns not in the store: {missing}")
+
+    arrays = {}
+    categories = {}
+    for name in columns:
+        column = by_name[name]
+        arrays[name] = np.load(os.path.join(path, column['file']), mmap_mode="r")
+        if column['categories'] is not None:
+            categories[name] = column['categories']
+    return arrays, categories
+
+
+def load_frame(path, columns=None, decode_categories=True):
+    """
+    Load a store as a pandas DataFrame backed by the memory-mapped columns.
+
+    Numeric columns are not copied. Text columns are returned as pandas
+    ``Categorical`` (or as their integer codes with ``decode_categories=False``).
+    """
+    import pandas as pd
+
+    arrays, categories = load_columns(path, columns)
+    data = {}
+    for name, array in arrays.items():
+        if decode_categories and name in categories:
+            data[name] = pd.Categorical.from_codes(array, categories[name])
+        else:
+            data[name] = array
+    return pd.DataFrame(data, copy=False)
+
+
+def load_dataset(csv_path, columns=None, store_dir=FEATURE_STORE_DIR):
+    """``load_frame`` for the store of ``csv_path``, building the store on first use."""
+    return load_frame(ensure_store(csv_path, store_dir), columns)
+
+
+def _median_seconds(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def _directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def compare_with_csv(csv_path, store_dir=FEATURE_STORE_DIR, projection=None, repeat=5):
+    """Time and size the CSV read against the store (full and projected loads)."""
+    import pandas as pd
+
+    path = ensure_store(csv_path, store_dir)
+    csv_frame = read_student_csv(csv_path)
+    store_frame = load_frame(path)
+    if projection is None:
+        projection = list(csv_frame.columns[:3])
+    with open(csv_path, encoding="utf-8-sig") as fh:
+        sep = detect_separator(fh.readline())
+
+    return {
+        'dataset': os.path.basename(csv_path),
+        'rows': len(csv_frame),
+        'columns': csv_frame.shape[1],
+        'csv_read_seconds': _median_seconds(lambda: read_student_csv(csv_path), repeat),
+        'csv_usecols_seconds': _median_seconds(
+            lambda: pd.read_csv(csv_path, sep=sep, usecols=projection, encoding="utf-8-sig"), repeat),
+        'store_load_seconds': _median_seconds(lambda: load_frame(path), repeat),
+        'store_projection_seconds': _median_seconds(lambda: load_frame(path, projection), repeat),
+        'csv_file_bytes': os.path.getsize(csv_path),
+        'store_file_bytes': _directory_bytes(path),
+        'csv_frame_bytes': int(csv_frame.memory_usage(deep=True).sum()),
+        'store_frame_bytes': int(store_frame.memory_usage(deep=True).sum()),
+        'projection': projection,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar, memory-mapped copies of the datasets")
+    parser.add_argument("command", choices=["convert", "report"])
+    parser.add_argument("datasets", nargs="*", default=DATASETS)
+    parser.add_argument("--store-dir", default=FEATURE_STORE_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for csv_path in args.datasets:
+        if args.command == "convert":
+            path = convert_csv(csv_path, args.store_dir)
+            schema = read_schema(path)
+            dtypes = sorted({column['dtype'] for column in schema['columns']})
+            print(f"{csv_path} -> {path} ({schema['rows']} rows, dtypes {', '.join(dtypes)})")
+            continue
+
+        r = compare_with_csv(csv_path, args.store_dir, repeat=args.repeat)
+        print(f"{r['dataset']} ({r['rows']} rows x {r['columns']} columns)")
+        print(f"  load, all columns:   CSV {r['csv_read_seconds'] * 1000:8.2f} ms   "
+              f"store {r['store_load_seconds'] * 1000:8.2f} ms   "
+              f"x{r['csv_read_seconds'] / r['store_load_seconds']:.0f} faster")
+        print(f"  load, {len(r['projection'])} columns:     CSV {r['csv_usecols_seconds'] * 1000:8.2f} ms   "
+              f"store {r['store_projection_seconds'] * 1000:8.2f} ms   "
+              f"x{r['csv_usecols_seconds'] / r['store_projection_seconds']:.0f} faster")
+        print(f"  in memory:           CSV {r['csv_frame_bytes'] / 1024:8.0f} KiB  "
+              f"store {r['store_frame_bytes'] / 1024:8.0f} KiB  "
+              f"{1 - r['store_frame_bytes'] / r['csv_frame_bytes']:.0%} smaller")
+        print(f"  on disk:             CSV {r['csv_file_bytes'] / 1024:8.0f} KiB  "
+              f"store {r['store_file_bytes'] / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Incremental re-scoring backed by a local SQLite index.
+
+Each student's model input row (the ``feature_names`` columns after the
+derived features, encoding and scaling) is fingerprinted with BLAKE2b. The
+index keeps two tables:
+
+- ``fingerprints``: fingerprint -> predicted probabilities, i.e. one model
+  result per distinct input row
+- ``students``: student id -> fingerprint of the last scored row
+
+On every run only rows whose fingerprint is not in the index yet go through
+``predict_proba``; all others reuse the stored probabilities, so reordered,
+duplicated or renamed students are reused too. Everything is dropped when
+the model bundle content hash differs from the one the index was built with.
+
+Without ``--id-column`` the row number is used as the student id; the
+new/changed/unchanged counts then follow row positions, while reuse still
+works on the fingerprints.
+
+Usage::
+
+    python incremental_scoring.py enrolled.csv scored.csv --index predictions.sqlite \
+        [--id-column Student_ID]
+"""
+import argparse
+import hashlib
+import sqlite3
+import time
+
+import numpy as np
+
+from model_registry import MODEL_DIR, get_model_registry
+from scoring import (DEFAULT_CHUNK_SIZE, build_feature_matrix, calculate_derived_features_batch,
+                     interpret_probabilities, read_student_csv)
+
+DEFAULT_INDEX_PATH = "predictions.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint BLOB PRIMARY KEY,
+    dropout_probability REAL NOT NULL,
+    graduate_probability REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY,
+    fingerprint BLOB NOT NULL,
+    scored_at REAL NOT NULL
+);
+"""
+
+
+def fingerprint_rows(matrix):
+    """Return a 16-byte BLAKE2b digest of every row of the model input ``matrix``."""
+    rows = np.ascontiguousarray(matrix, dtype=np.float64)
+    # -0.0 and 0.0 feed the model the same value; give them the same fingerprint
+    rows = rows + 0.0
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in rows]
+
+
+class PredictionIndex:
+    """
+    SQLite store of the last prediction per fingerprint and per student.
+
+    Parameters:
+    -----------
+    path : str
+        Database file (``":memory:"`` for a throwaway index)
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def model_version(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'model_version'").fetchone()
+        return row[0] if row else None
+
+    def bind_model(self, version):
+        """
+        Tie the index to the model bundle ``version``.
+
+        If the index was built with a different version every stored result
+        is dropped. Returns the number of invalidated fingerprints.
+        """
+        if self.model_version() == version:
+            return 0
+        with self._conn:
+            invalidated = self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+            self._conn.execute("DELETE FROM fingerprints")
+            self._conn.execute("DELETE FROM students")
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('model_version', ?)", (version,))
+        return invalidated
+
+    def lookup(self, student_ids, fingerprints):
+        """
+        Look up a batch of rows.
+
+        Returns:
+        --------
+        tuple
+            ``(probability, found, previous)``: an ``(n, 2)`` array with the
+            stored probabilities, a boolean mask of the rows that were found,
+            and the previous fingerprint of each student (``None`` if new)
+        """
+        n = len(fingerprints)
+        with self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch "
+                               "(pos INTEGER PRIMARY KEY, student_id TEXT, fingerprint BLOB)")
+            self._conn.execute("DELETE FROM batch")
+            self._conn.executemany("INSERT INTO batch VALUES (?, ?, ?)",
+                                   zip(range(n), student_ids, fingerprints))
+
+            probability = np.zeros((n, 2), dtype=np.float64)
+            found = np.zeros(n, dtype=bool)
+            for pos, dropout_p, graduate_p in self._conn.execute(
+                    "SELECT b.pos, f.dropout_probability, f.graduate_probability "
+                    "FROM batch b JOIN fingerprints f ON f.fingerprint = b.fingerprint"):
+                probability[pos] = (dropout_p, graduate_p)
+                found[pos] = True
+
+            previous = [None] * n
+            for pos, fingerprint in self._conn.execute(
+                    "SELECT b.pos, s.fingerprint FROM batch b "
+                    "JOIN students s ON s.student_id = b.student_id"):
+                previous[pos] = fingerprint
+        return probability, found, previous
+
+    def store(self, student_ids, fingerprints, probability, new_rows):
+        """Save the new fingerprints (``new_rows`` mask) and every student's latest fingerprint."""
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO fingerprints VALUES (?, ?, ?)",
+                ((fingerprints[i], float(probability[i, 0]), float(probability[i, 1]))
+                 for i in np.flatnonzero(new_rows)))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO students VALUES (?, ?, ?)",
+                ((student_id, fingerprint, now)
+                 for student_id, fingerprint in zip(student_ids, fingerprints)))
+
+    def stats(self):
+        fingerprints = self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        students = self._conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        return {'fingerprints': fingerprints, 'students': students,
+                'model_version': self.model_version()}
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def incremental_score(df, bundle, index, id_column=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Score ``df``, reusing the predictions stored in ``index`` for unchanged rows.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Student records, app-style labels or the raw data.csv schema
+    bundle : ModelBundle
+        Model bundle; its ``version`` must be set (registry or compiled bundle)
+    index : PredictionIndex
+        Index of earlier predictions; invalidated if ``bundle.version`` differs
+    id_column : str, optional
+        Column identifying the student (default: the row number)
+    chunk_size : int
+        Rows looked up and scored per step
+
+    Returns:
+    --------
+    tuple
+        ``(scored, summary)``: ``df`` with the derived features and
+        prediction columns, and a dict with the ``reused``/``recomputed``
+        row counts, the ``new``/``changed``/``unchanged`` student counts and
+        the number of ``invalidated`` index entries
+    """
+    if bundle.model is None:
+        raise ValueError("Cannot score: no model loaded")
+    if id_column is not None and id_column not in df:
+        raise KeyError(f"Id column not found: {id_column}")
+
+    model, feature_names, encoders, scaler = bundle.as_tuple()
+    summary = {'rows': len(df), 'reused': 0, 'recomputed': 0,
+               'new': 0, 'changed': 0, 'unchanged': 0,
+               'invalidated': index.bind_model(bundle.version)}
+
+    scored = calculate_derived_features_batch(df)
+    if id_column is None:
+        all_ids = [str(i) for i in range(len(df))]
+    else:
+        all_ids = df[id_column].astype(str).tolist()
+
+    probability = np.empty((len(scored), 2), dtype=np.float64)
+    for start in range(0, len(scored), chunk_size):
+        chunk = scored.iloc[start:start + chunk_size]
+        student_ids = all_ids[start:start + len(chunk)]
+        matrix = build_feature_matrix(chunk, feature_names, encoders, scaler)
+        fingerprints = fingerprint_rows(matrix)
+
+        chunk_probability, found, previous = index.lookup(student_ids, fingerprints)
+        missing = ~found
+        if missing.any():
+            chunk_probability[missing] = model.predict_proba(matrix[missing])
+        index.store(student_ids, fingerprints, chunk_probability, missing)
+        probability[start:start + len(chunk)] = chunk_probability
+
+        summary['reused'] += int(found.sum())
+        summary['recomputed'] += int(missing.sum())
+        for before, after in zip(previous, fingerprints):
+            if before is None:
+                summary['new'] += 1
+            elif before == after:
+                summary['unchanged'] += 1
+            else:
+                summary['changed'] += 1
+
+    predicted_status, risk_level = interpret_probabilities(probability[:, 0], probability[:, 1])
+    scored['dropout_probability'] = probability[:, 0]
+    scored['graduate_probability'] = probability[:, 1]
+    scored['predicted_status'] = predicted_status
+    scored['risk_level'] = risk_level
+    return scored, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score only the students whose inputs changed")
+    parser.add_argument("input", help="CSV in the raw data.csv schema or with app-style labels")
+    parser.add_argument("output", help="Scored CSV")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="SQLite prediction index")
+    parser.add_argument("--id-column", help="Column with the student id (default: row number)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+
+    bundle = get_model_registry(args.model_dir).get()
+    df = read_student_csv(args.input)
+    started = time.perf_counter()
+    with PredictionIndex(args.index) as index:
+        scored, summary = incremental_score(df, bundle, index, args.id_column)
+    seconds = time.perf_counter() - started
+    scored.to_csv(args.output, index=False)
+
+    if summary['invalidated']:
+        print(f"Model changed: invalidated {summary['invalidated']:,} stored predictions")
+    print(f"Scored {summary['rows']:,} rows in {seconds:.2f} s: "
+          f"{summary['reused']:,} reused, {summary['recomputed']:,} recomputed "
+          f"({summary['new']:,} new, {summary['changed']:,} changed, "
+          f"{summary['unchanged']:,} unchanged students)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Per-stage timing, counters and a sampling profiler for the scoring hot path.
+
+Timing is off by default. While it is off, ``stage()`` returns a shared
+no-op context manager and ``observe``/``count`` return immediately, so the
+instrumented code pays a few hundred nanoseconds per stage. Switch it on
+with ``DROPOUT_METRICS=1`` in the environment or ``enable()`` at runtime.
+
+Recorded stages (histogram label ``stage``):
+
+- ``model_load``: loading the model bundle in the registry
+- ``derived_features``, ``encode``, ``scale``, ``assemble``,
+  ``cache_lookup``, ``predict_proba``, ``interpret``, ``explain``: the steps
+  of one ``predict_dropout_risk`` call
+- ``batch_derived_features``, ``batch_feature_matrix``,
+  ``batch_predict_proba``: the column-wise batch path
+- ``queue_batch``: one batched call of the app's scoring queue
+- ``render_gauge``, ``render_confusion_matrix``: chart rendering
+
+``render_prometheus()`` returns everything in the Prometheus text format,
+including the stats of the model registry and prediction cache (gathered
+from registered collectors at scrape time). ``start_profiler()`` /
+``stop_profiler()`` sample the stacks of all threads in the background and
+return them in the collapsed format used by flame graph tools.
+"""
+import bisect
+import collections
+import os
+import sys
+import threading
+import time
+
+# Upper bounds in seconds, from 50 µs (one encoding step) to 5 s (cold model load)
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_METRIC = "dropout_stage_duration_seconds"
+
+_enabled = os.environ.get("DROPOUT_METRICS", "") not in ("", "0")
+
+
+def enable():
+    """Start recording stage timings and counters."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording; already recorded values are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Bucket upper bound below which a fraction ``q`` of observations fall."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            if cumulative >= rank:
+                return bound
+        return self.max
+
+
+class Metrics:
+    """Thread-safe store of stage histograms, counters and scrape-time collectors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = collections.defaultdict(int)
+        self._collectors = []
+
+    def observe(self, stage_name, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage_name)
+            if histogram is None:
+                histogram = self._stages[stage_name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def register_collector(self, collector):
+        """
+        Add ``collector()``, called at scrape time.
+
+        It returns a list of ``(name, type, help, [(labels, value), ...])``.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self):
+        """Drop recorded timings and counters (collectors stay registered)."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def stage_summary(self):
+        """Return ``{stage: {count, mean_ms, p50_ms, p95_ms, max_ms}}`` (bucket-resolution quantiles)."""
+        with self._lock:
+            summary = {}
+            for name, h in sorted(self._stages.items()):
+                summary[name] = {
+                    'count': h.count,
+                    'mean_ms': h.sum / h.count * 1000,
+                    'p50_ms': h.quantile(0.5) * 1000,
+                    'p95_ms': h.quantile(0.95) * 1000,
+                    'max_ms': h.max * 1000,
+                }
+            return summary
+
+    def render_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            stages = {name: (list(h.counts), h.count, h.sum) for name, h in self._stages.items()}
+            counters = dict(self._counters)
+            collectors = list(self._collectors)
+
+        lines.append(f"# HELP {STAGE_METRIC} Time spent in each stage of the scoring path")
+        lines.append(f"# TYPE {STAGE_METRIC} histogram")
+        for name in sorted(stages):
+            counts, total, seconds = stages[name]
+            cumulative = 0
+            for bound, n in zip(STAGE_BUCKETS, counts):
+                cumulative += n
+                lines.append(f'{STAGE_METRIC}_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{STAGE_METRIC}_bucket{{stage="{name}",le="+Inf"}} {total}')
+            lines.append(f'{STAGE_METRIC}_sum{{stage="{name}"}} {seconds!r}')
+            lines.append(f'{STAGE_METRIC}_count{{stage="{name}"}} {total}')
+
+        # Families are merged by name: several collectors (e.g. one registry
+        # per model directory) may report the same metric with other labels,
+        # and HELP/TYPE may only appear once per metric
+        families = {}
+        for (name, labels), value in sorted(counters.items()):
+            families.setdefault(name, ['counter', '', []])[2].append((dict(labels), value))
+        for collector in collectors:
+            for name, metric_type, help_text, samples in collector():
+                family = families.setdefault(name, [metric_type, help_text, []])
+                family[1] = family[1] or help_text
+                family[2].extend(samples)
+
+        for name, (metric_type, help_text, samples) in families.items():
+            if help_text:
+                lines.append(f"# HELP {name} {_escape_help(help_text)}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in sorted(labels.items()))
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                             else f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_help(text):
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_value(value):
+    return "NaN" if value is None else str(value)
+
+
+metrics = Metrics()
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _StageTimer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage(name):
+    """Context manager timing the enclosed block as stage ``name`` (no-op when disabled)."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _StageTimer(name)
+
+
+def observe(stage_name, seconds):
+    """Record an already measured duration for ``stage_name``."""
+    if _enabled:
+        metrics.observe(stage_name, seconds)
+
+
+def count(name, amount=1, **labels):
+    """Increment counter ``name`` by ``amount``."""
+    if _enabled:
+        metrics.count(name, amount, **labels)
+
+
+def register_collector(collector):
+    metrics.register_collector(collector)
+
+
+def render_prometheus():
+    return metrics.render_prometheus()
+
+
+class SamplingProfiler:
+    """
+    Background thread that samples the Python stacks of all other threads.
+
+    Every ``interval`` seconds the current frame of each thread is walked and
+    the stack is counted as ``file:function;file:function;...`` (root first),
+    the collapsed format read by flame graph tools.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Return the sampled stacks, one ``stack count`` line each, most frequent first."""
+        return "".join(f"{stack} {n}\n" for stack, n in self._stacks.most_common())
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def start_profiler(interval=0.005):
+    """Start the process-wide sampling profiler; returns ``False`` if it is already running."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None:
+            return False
+        _profiler = SamplingProfiler(interval).start()
+        return True
+
+
+def stop_profiler():
+    """Stop the sampling profiler and return its collapsed stacks (``None`` if not running)."""
+    global _profiler
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    return profiler.stop().collapsed()
+
+
+def profiler_running():
+    return _profiler is not None
@@ -0,0 +1,358 @@
+"""
+Single-file, versioned model artifact with a manifest and memory-mapped arrays.
+
+``pack_artifact`` writes the bundle of ``model/`` (model, feature names,
+encoders, scaler: nine ``.joblib`` files) into ``model/dropout_model.artifact``:
+
+- an 8-byte magic, the format version and the length of the manifest
+- the manifest, UTF-8 JSON: ``model_version`` (content hash of the
+  ``.joblib`` files it was packed from, the bundle version everywhere else),
+  ``content_hash`` (SHA-256 of the manifest and the data that follows), the
+  feature order, the categorical mappings as plain lists of class labels,
+  the numerical features fed to the scaler, and a table of the arrays
+- the arrays, raw and 64-byte aligned: the booster in XGBoost's own binary
+  model format, the scaler ``mean``/``scale`` vectors and the compiled trees
+  of ``compiled_model.py``
+
+Nothing is pickled. ``load_artifact`` maps the file once with ``mmap`` and
+builds every array as a read-only view into it. With ``engine="compiled"``
+(or ``"auto"`` when xgboost is not installed) the model itself evaluates the
+mapped tree arrays, so worker processes that load the same artifact share
+its pages. Only this engine is zero-copy. ``engine="xgboost"`` rebuilds the
+booster from the mapped bytes into the process's own memory. It still gives
+bit-identical predictions and also provides explanations, but each process
+holds its own copy of the model.
+
+The model registry loads the artifact instead of the ``.joblib`` files
+whenever it was packed from them (or they are absent); pack it again after
+retraining. The registry uses ``"auto"``, because the app needs the
+booster for explanations and xgboost scores batches faster.
+``--compiled model/dropout_model.artifact`` of the scoring server and the
+batch scripts opts in to the compiled engine.
+
+Usage::
+
+    python model_artifact.py pack [--model-file XGBoost_model.joblib]   # also refreshes the reports
+    python model_artifact.py verify   # integrity, staleness and parity with the joblib model
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from compiled_model import ArrayLabelEncoder, ArrayScaler, CompiledModel, compile_booster
+from model_registry import (CATEGORICAL_FEATURES, MODEL_DIR, PACKAGED_ARTIFACT, ModelBundle,
+                            content_hash, joblib_files, load_joblib_bundle)
+
+MAGIC = b"DRPMODEL"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_HEADER = struct.Struct("<8sIQ")  # magic, format version, manifest length
+_COMPILED_ARRAYS = ['base_score', 'split_feature', 'split_value', 'default_left', 'leaf_value']
+
+
+class ArtifactError(ValueError):
+    """Raised for artifacts that are malformed, of another format or fail the integrity check."""
+
+
+def artifact_path(model_dir=MODEL_DIR):
+    """Path of the packaged artifact that belongs to ``model_dir``."""
+    return os.path.join(model_dir, PACKAGED_ARTIFACT)
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _manifest_digest(manifest, data):
+    """SHA-256 over the manifest (without ``content_hash``) and the data region."""
+    digest = hashlib.sha256()
+    unsigned = {key: value for key, value in manifest.items() if key != 'content_hash'}
+    digest.update(json.dumps(unsigned, sort_keys=True).encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _booster_bytes(model):
+    """The model in XGBoost's binary (UBJSON) format, sklearn wrapper attributes included."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.ubj")
+        model.save_model(path)
+        with open(path, "rb") as fh:
+            return fh.read()
+
+
+def pack_artifact(model_dir=MODEL_DIR, output_path=None, model_file=None):
+    """
+    Package the ``.joblib`` bundle of ``model_dir`` into one artifact file.
+
+    Parameters:
+    -----------
+    model_dir : str
+        Directory with the ``.joblib`` artifacts
+    output_path : str, optional
+        Artifact path (default: ``<model_dir>/dropout_model.artifact``)
+    model_file : str, optional
+        Model file to package when ``model_dir`` holds several ``*_model.joblib``
+
+    Returns:
+    --------
+    dict
+        The manifest of the written artifact
+    """
+    if output_path is None:
+        output_path = artifact_path(model_dir)
+    bundle = load_joblib_bundle(model_dir, model_file=model_file)
+    if bundle.error is not None:
+        raise bundle.error
+    if bundle.model is None or not hasattr(bundle.model, "get_booster"):
+        raise ValueError(f"No XGBoost model found in {model_dir}")
+    if model_file is None:
+        model_file = next(f for f in joblib_files(model_dir) if f.endswith("_model.joblib"))
+
+    numerical_features = [f for f in bundle.feature_names if f not in CATEGORICAL_FEATURES]
+    arrays = {
+        'booster': np.frombuffer(_booster_bytes(bundle.model), dtype=np.uint8),
+        'scaler_mean': np.asarray(bundle.scaler.mean_, dtype=np.float64),
+        'scaler_scale': np.asarray(bundle.scaler.scale_, dtype=np.float64),
+    }
+    arrays.update(compile_booster(bundle.model.get_booster()))
+
+    table = []
+    blobs = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        offset = _aligned(offset)
+        table.append({'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape),
+                      'offset': offset, 'nbytes': array.nbytes})
+        blobs.append((offset, array.tobytes()))
+        offset += array.nbytes
+    data = bytearray(offset)
+    for start, blob in blobs:
+        data[start:start + len(blob)] = blob
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_version': content_hash(model_dir),
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        'model_file': model_file,
+        'model_class': type(bundle.model).__name__,
+        'feature_names': list(bundle.feature_names),
+        'categorical_features': {feature: np.asarray(encoder.classes_).astype(str).tolist()
+                                 for feature, encoder in sorted(bundle.encoders.items())},
+        'numerical_features': numerical_features,
+        'arrays': table,
+    }
+    manifest['content_hash'] = _manifest_digest(manifest, data)
+
+    manifest_bytes = json.dumps(manifest, indent=2).encode("utf-8")
+    data_start = _aligned(_HEADER.size + len(manifest_bytes))
+    with open(output_path + ".tmp", "wb") as fh:
+        fh.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)))
+        fh.write(manifest_bytes)
+        fh.write(b"\0" * (data_start - _HEADER.size - len(manifest_bytes)))
+        fh.write(data)
+    os.replace(output_path + ".tmp", output_path)
+    return manifest
+
+
+def _read_header(fh, path):
+    header = fh.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise ArtifactError(f"{path} is too short to be a model artifact")
+    magic, format_version, manifest_length = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ArtifactError(f"{path} is not a model artifact")
+    if format_version != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported model artifact format {format_version} in {path}")
+    return manifest_length
+
+
+def is_packaged_artifact(path):
+    """Whether ``path`` starts with the artifact magic."""
+    with open(path, "rb") as fh:
+        return fh.read(len(MAGIC)) == MAGIC
+
+
+def read_manifest(path):
+    """Read only the manifest of the artifact at ``path``."""
+    with open(path, "rb") as fh:
+        manifest_length = _read_header(fh, path)
+        return json.loads(fh.read(manifest_length))
+
+
+def map_arrays(path, verify=True):
+    """
+    Memory-map the artifact and return ``(manifest, arrays)``.
+
+    Every array is a read-only view into the shared mapping. With ``verify``
+    the content hash is checked first (a pass over the mapped pages).
+    """
+    with open(path, "rb") as fh:
+        manifest_length = _read_header(fh, path)
+        manifest = json.loads(fh.read(manifest_length))
+        mapping = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data_start = _aligned(_HEADER.size + manifest_length)
+    data = memoryview(mapping)[data_start:]
+    if verify and _manifest_digest(manifest, data) != manifest['content_hash']:
+        raise ArtifactError(f"Content hash mismatch: {path} is corrupted or was modified")
+
+    arrays = {}
+    for entry in manifest['arrays']:
+        dtype = np.dtype(entry['dtype'])
+        array = np.frombuffer(mapping, dtype=dtype, count=entry['nbytes'] // dtype.itemsize,
+                              offset=data_start + entry['offset'])
+        arrays[entry['name']] = array.reshape(entry['shape'])
+    return manifest, arrays
+
+
+def _load_xgboost_model(manifest, arrays):
+    import xgboost as xgb
+
+    model = getattr(xgb, manifest['model_class'])()
+    model.load_model(bytearray(arrays['booster']))
+    return model
+
+
+def load_artifact(path=artifact_path(), engine="auto", verify=True):
+    """
+    Load a packaged artifact as a :class:`ModelBundle`.
+
+    Parameters:
+    -----------
+    path : str
+        Artifact file
+    engine : str
+        ``"xgboost"`` rebuilds the booster (needed for explanations),
+        ``"compiled"`` evaluates the memory-mapped trees with NumPy only
+        (the only engine whose model is shared between processes),
+        ``"auto"`` uses xgboost when it is installed
+    verify : bool
+        Check the content hash before use
+
+    Returns:
+    --------
+    ModelBundle
+        With ``version`` set to the manifest's ``model_version``
+    """
+    if engine not in ("auto", "xgboost", "compiled"):
+        raise ValueError(f"Unknown engine: {engine}")
+    manifest, arrays = map_arrays(path, verify)
+
+    if engine == "auto":
+        try:
+            import xgboost  # noqa: F401
+
+            engine = "xgboost"
+        except ImportError:
+            engine = "compiled"
+    if engine == "xgboost":
+        model = _load_xgboost_model(manifest, arrays)
+    else:
+        model = CompiledModel(*(arrays[name] for name in _COMPILED_ARRAYS))
+
+    encoders = {feature: ArrayLabelEncoder(classes)
+                for feature, classes in manifest['categorical_features'].items()}
+    scaler = ArrayScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+    return ModelBundle(model, list(manifest['feature_names']), encoders, scaler,
+                       version=manifest['model_version'])
+
+
+def verify_artifact(path, model_dir=MODEL_DIR, data_path="data.csv"):
+    """
+    Check the integrity of the artifact and compare it with the ``.joblib`` bundle.
+
+    Returns:
+    --------
+    dict
+        ``stale`` (packed from other ``.joblib`` files than the current ones,
+        ``None`` without ``.joblib`` files) and, when the joblib bundle is
+        present, the number of rows of ``data_path`` and of
+        ``compiled_model.random_feature_matrix`` whose probabilities differ
+        per engine (``mismatches``)
+    """
+    from compiled_model import count_mismatches, random_feature_matrix
+    from scoring import build_feature_matrix, calculate_derived_features_batch, read_student_csv
+
+    manifest, _ = map_arrays(path, verify=True)
+    result = {'model_version': manifest['model_version'], 'stale': None, 'mismatches': {}}
+    if not joblib_files(model_dir):
+        return result
+    result['stale'] = manifest['model_version'] != content_hash(model_dir)
+    reference = load_joblib_bundle(model_dir, model_file=manifest['model_file'])
+    if result['stale'] or reference.model is None or not os.path.exists(data_path):
+        return result
+
+    students = calculate_derived_features_batch(read_student_csv(data_path))
+    X = build_feature_matrix(students, reference.feature_names, reference.encoders, reference.scaler)
+    X_random = random_feature_matrix(load_artifact(path, engine="compiled", verify=False).model,
+                                     len(reference.feature_names))
+    for engine in ("xgboost", "compiled"):
+        bundle = load_artifact(path, engine=engine, verify=False)
+        X_artifact = build_feature_matrix(students, bundle.feature_names, bundle.encoders,
+                                          bundle.scaler)
+        if not np.array_equal(X, X_artifact):
+            result['mismatches'][engine] = len(X)
+            continue
+        result['mismatches'][engine] = (count_mismatches(reference.model, bundle.model, X)
+                                        + count_mismatches(reference.model, bundle.model, X_random))
+    return result
+
+
+def refresh_reports(model_dir=MODEL_DIR):
+    """Regenerate the saved reports the app reads when they belong to another model version."""
+    from explanations import ensure_global_importance, importance_path
+    from model_evaluation import ensure_report, report_path
+
+    if ensure_report(model_dir) is None:
+        print("Evaluation report not updated: no model loaded or no evaluation dataset")
+    else:
+        print(f"Evaluation report up to date: {report_path(model_dir)}")
+    if ensure_global_importance(model_dir) is None:
+        print("Feature importance not updated: no explainable model or no dataset")
+    else:
+        print(f"Feature importance up to date: {importance_path(model_dir)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Package or verify the single-file model artifact")
+    parser.add_argument("command", choices=["pack", "verify"])
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--model-file", help="Model file to package when there are several")
+    parser.add_argument("--output", help="Artifact path (default: <model-dir>/dropout_model.artifact)")
+    parser.add_argument("--data", default="data.csv", help="Rows used by the parity check")
+    args = parser.parse_args()
+
+    path = args.output or artifact_path(args.model_dir)
+    if args.command == "pack":
+        manifest = pack_artifact(args.model_dir, path, args.model_file)
+        print(f"Packed {manifest['model_file']} and {len(manifest['categorical_features'])} encoders "
+              f"into {path} ({os.path.getsize(path) / 1024:.0f} KiB, "
+              f"model {manifest['model_version'][:12]}, content {manifest['content_hash'][:12]})")
+        # The app only reads the saved reports, so refresh them for the packed model here
+        refresh_reports(args.model_dir)
+        return
+
+    result = verify_artifact(path, args.model_dir, args.data)
+    print(f"{path}: content hash OK (model {result['model_version'][:12]})")
+    if result['stale']:
+        print("Artifact is STALE: the .joblib files changed since packing; run 'pack' again")
+        sys.exit(1)
+    for engine, mismatches in result['mismatches'].items():
+        print(f"  {engine:8s} engine: {mismatches} rows differ from the joblib model")
+    if any(result['mismatches'].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
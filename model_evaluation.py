@@ -0,0 +1,262 @@
+"""
+Evaluation report of the deployed model on the held-out test set.
+
+The model is scored once on the test split of ``df_clean_processed.csv``
+(the same ``train_test_split(test_size=0.2, random_state=42, stratify=y)``
+as the training notebook) and the results are saved to
+``model/evaluation_report.json`` next to the model artifacts:
+
+- confusion matrix, accuracy, per-class precision/recall/F1 and ROC-AUC,
+  with Dropout as the positive class
+- calibration bins of the predicted dropout probability and the Brier score
+- single-record scoring latency percentiles and batch throughput
+
+The report records the content hash of the bundle it was computed with.
+It is produced offline: by this script or by ``python model_artifact.py
+pack`` after retraining. ``ensure_report`` only regenerates it when that
+hash changes. The app never evaluates. It reads the JSON file with
+``load_report`` and, when ``report_is_current`` is false, asks for this
+script to be run.
+
+Usage::
+
+    python model_evaluation.py            # regenerate if the model changed
+    python model_evaluation.py --force    # always regenerate
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from model_registry import MODEL_DIR, get_model_registry
+
+REPORT_FILENAME = "evaluation_report.json"
+REPORT_FORMAT_VERSION = 1
+EVALUATION_DATA = "df_clean_processed.csv"
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+CLASS_LABELS = ['Dropout', 'Graduate']
+CALIBRATION_BINS = 10
+LATENCY_SAMPLES = 200
+
+_report_lock = threading.Lock()
+
+
+def report_path(model_dir=MODEL_DIR):
+    """Path of the evaluation report that belongs to ``model_dir``."""
+    return os.path.join(model_dir, REPORT_FILENAME)
+
+
+def load_report(model_dir=MODEL_DIR):
+    """Return the saved evaluation report, or ``None`` if there is none."""
+    path = report_path(model_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def report_is_current(report, version):
+    """Whether ``report`` was computed with this report format for the bundle ``version``."""
+    return (report is not None
+            and report.get('format_version') == REPORT_FORMAT_VERSION
+            and report.get('model_version') == version)
+
+
+def load_test_split(data_path=EVALUATION_DATA, feature_names=None):
+    """
+    Return ``(X_test, y_test)`` of the processed dataset.
+
+    ``df_clean_processed.csv`` is already encoded and scaled, so the rows go
+    to the model as they are (in ``feature_names`` order). ``y`` is 0 for
+    Dropout and 1 for Graduate.
+    """
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(data_path)
+    X = df.drop(columns=['Status'])
+    if feature_names is not None:
+        X = X[list(feature_names)]
+    y = df['Status'].astype(int)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE,
+                                            stratify=y)
+    return X_test, y_test.to_numpy()
+
+
+def calibration_bins(y_true_positive, probability, n_bins=CALIBRATION_BINS):
+    """Equal-width bins of ``probability`` with the observed positive rate in each."""
+    edges = np.round(np.linspace(0.0, 1.0, n_bins + 1), 6)
+    index = np.clip(np.digitize(probability, edges[1:-1]), 0, n_bins - 1)
+    bins = []
+    for i in range(n_bins):
+        in_bin = index == i
+        count = int(in_bin.sum())
+        bins.append({
+            'lower': float(edges[i]),
+            'upper': float(edges[i + 1]),
+            'count': count,
+            'mean_predicted': float(probability[in_bin].mean()) if count else None,
+            'observed_rate': float(y_true_positive[in_bin].mean()) if count else None,
+        })
+    return bins
+
+
+def measure_latency(model, X, n_samples=LATENCY_SAMPLES):
+    """Time single-record ``predict_proba`` calls and one call on all of ``X``."""
+    X = np.asarray(X, dtype=np.float64)
+    model.predict_proba(X[:1])  # warm-up
+
+    durations = []
+    for row in X[:n_samples]:
+        start = time.perf_counter()
+        model.predict_proba(row.reshape(1, -1))
+        durations.append(time.perf_counter() - start)
+    durations_ms = np.array(durations) * 1000
+
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        'single_record_ms': {
+            'samples': len(durations),
+            'mean': float(durations_ms.mean()),
+            'p50': float(np.percentile(durations_ms, 50)),
+            'p95': float(np.percentile(durations_ms, 95)),
+            'p99': float(np.percentile(durations_ms, 99)),
+        },
+        'batch': {
+            'rows': len(X),
+            'seconds': batch_seconds,
+            'rows_per_second': len(X) / batch_seconds if batch_seconds else None,
+        },
+    }
+
+
+def evaluate_model(bundle, data_path=EVALUATION_DATA):
+    """
+    Score the held-out test set with ``bundle`` and build the evaluation report.
+
+    Parameters:
+    -----------
+    bundle : ModelBundle
+        Loaded model bundle (its ``version`` is recorded in the report)
+    data_path : str
+        Path of the processed dataset
+
+    Returns:
+    --------
+    dict
+        The JSON-serializable report
+    """
+    from sklearn.metrics import (accuracy_score, brier_score_loss, confusion_matrix,
+                                 precision_recall_fscore_support, roc_auc_score)
+
+    X_test, y_test = load_test_split(data_path, bundle.feature_names)
+    probability = np.asarray(bundle.model.predict_proba(X_test.to_numpy(np.float64)),
+                             dtype=np.float64)
+    dropout_probability = probability[:, 0]
+    # Same decision rule as interpret_probabilities
+    y_pred = (probability[:, 1] > 0.5).astype(int)
+    is_dropout = (y_test == 0).astype(int)
+
+    precision, recall, f1, support = precision_recall_fscore_support(y_test, y_pred, labels=[0, 1],
+                                                                     zero_division=0)
+    per_class = {
+        label: {'precision': float(precision[i]), 'recall': float(recall[i]),
+                'f1': float(f1[i]), 'support': int(support[i])}
+        for i, label in enumerate(CLASS_LABELS)
+    }
+    per_class['macro avg'] = {
+        'precision': float(precision.mean()), 'recall': float(recall.mean()),
+        'f1': float(f1.mean()), 'support': int(support.sum()),
+    }
+
+    return {
+        'format_version': REPORT_FORMAT_VERSION,
+        'model_version': bundle.version,
+        'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        'dataset': {
+            'path': os.path.basename(data_path),
+            'test_rows': int(len(y_test)),
+            'test_size': TEST_SIZE,
+            'random_state': RANDOM_STATE,
+            'stratified': True,
+        },
+        'positive_class': 'Dropout',
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'confusion_matrix': {
+            'labels': CLASS_LABELS,
+            'matrix': confusion_matrix(y_test, y_pred, labels=[0, 1]).tolist(),
+        },
+        'classification_report': per_class,
+        'roc_auc': float(roc_auc_score(is_dropout, dropout_probability)),
+        'calibration': {
+            'brier_score': float(brier_score_loss(is_dropout, dropout_probability)),
+            'bins': calibration_bins(is_dropout, dropout_probability),
+        },
+        'latency': measure_latency(bundle.model, X_test),
+    }
+
+
+def save_report(report, model_dir=MODEL_DIR):
+    """Write ``report`` atomically to ``model_dir``."""
+    path = report_path(model_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(report, fh, indent=2)
+    os.replace(tmp_path, path)
+
+
+def ensure_report(model_dir=MODEL_DIR, data_path=EVALUATION_DATA, bundle=None, force=False):
+    """
+    Return the evaluation report of the current model, regenerating it if needed.
+
+    The saved report is reused as long as its ``model_version`` matches the
+    content hash of the bundle. Returns ``None`` when no model is loaded, or
+    when the report is stale and the dataset is not available to rebuild it.
+    """
+    if bundle is None:
+        bundle = get_model_registry(model_dir).get()
+    if bundle.model is None:
+        return None
+
+    with _report_lock:
+        report = load_report(model_dir)
+        if not force and report_is_current(report, bundle.version):
+            return report
+        if not os.path.exists(data_path):
+            return None
+        report = evaluate_model(bundle, data_path)
+        save_report(report, model_dir)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the model on the held-out test set")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--data", default=EVALUATION_DATA, help="Processed dataset (with Status)")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the model is unchanged")
+    args = parser.parse_args()
+
+    report = ensure_report(args.model_dir, args.data, force=args.force)
+    if report is None:
+        raise SystemExit("No model loaded or no dataset to evaluate on")
+
+    dropout = report['classification_report']['Dropout']
+    latency = report['latency']['single_record_ms']
+    print(f"Report: {report_path(args.model_dir)} (model {report['model_version'][:12]})")
+    print(f"accuracy {report['accuracy']:.3f}  ROC-AUC {report['roc_auc']:.3f}  "
+          f"dropout precision {dropout['precision']:.3f} recall {dropout['recall']:.3f} "
+          f"F1 {dropout['f1']:.3f}")
+    print(f"single-record latency p50 {latency['p50']:.2f} ms  p95 {latency['p95']:.2f} ms  "
+          f"p99 {latency['p99']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Process-wide registry for the dropout prediction model bundle.
+
+The registry loads the model, feature names, label encoders and scaler from
+the ``model/`` directory once and shares the same objects with every caller
+(Streamlit sessions, scripts, workers). The artifact files are re-checked
+with a cheap ``os.stat`` at most every ``check_interval`` seconds; the bundle
+is only reloaded when the content hash of the artifacts actually changes.
+
+When ``model/dropout_model.artifact`` (see ``model_artifact.py``) was packed
+from the current ``.joblib`` files, or is the only artifact, the bundle is
+read from that single memory-mapped file instead of unpickling nine files.
+An artifact that cannot be read (corrupt, wrong format) is skipped with a
+logged warning and the ``.joblib`` files are loaded instead.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = "model"
+PACKAGED_ARTIFACT = "dropout_model.artifact"
+
+CATEGORICAL_FEATURES = ['Gender', 'Scholarship_holder', 'Debtor',
+                        'Tuition_fees_up_to_date', 'Displaced',
+                        'Daytime_evening_attendance']
+
+
+class ModelBundle:
+    """Loaded model components plus the version they were loaded from."""
+
+    def __init__(self, model, feature_names, encoders, scaler, version, error=None):
+        self.model = model
+        self.feature_names = feature_names
+        self.encoders = encoders
+        self.scaler = scaler
+        self.version = version
+        self.error = error
+
+    def as_tuple(self):
+        """Return ``(model, feature_names, encoders, scaler)``."""
+        return self.model, self.feature_names, self.encoders, self.scaler
+
+
+def _default_encoder(feature):
+    """Create the demonstration encoder used when an encoder file is missing."""
+    from sklearn.preprocessing import LabelEncoder
+
+    encoder = LabelEncoder()
+    if feature == 'Gender':
+        encoder.classes_ = np.array(['Male', 'Female'])
+    elif feature == 'Daytime_evening_attendance':
+        encoder.classes_ = np.array(['Evening', 'Daytime'])
+    else:
+        encoder.classes_ = np.array(['No', 'Yes'])
+    return encoder
+
+
+def _default_scaler():
+    """Create the unfitted scaler used when the scaler file is missing."""
+    from sklearn.preprocessing import StandardScaler
+
+    return StandardScaler()
+
+
+def joblib_files(model_dir=MODEL_DIR):
+    """List the ``.joblib`` artifact files in ``model_dir`` in a stable order."""
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(f for f in os.listdir(model_dir) if f.endswith(".joblib"))
+
+
+def artifact_files(model_dir=MODEL_DIR):
+    """List the ``.joblib`` files and the packaged artifact (if any) in a stable order."""
+    files = joblib_files(model_dir)
+    if os.path.exists(os.path.join(model_dir, PACKAGED_ARTIFACT)):
+        files.append(PACKAGED_ARTIFACT)
+    return files
+
+
+def stat_signature(model_dir=MODEL_DIR):
+    """
+    Return a cheap ``(name, mtime_ns, size)`` signature of the artifacts.
+
+    A file removed between listing and ``stat`` is left out, so the
+    signature differs from one taken while it existed.
+    """
+    signature = []
+    for name in artifact_files(model_dir):
+        try:
+            st = os.stat(os.path.join(model_dir, name))
+        except FileNotFoundError:
+            continue
+        signature.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def content_hash(model_dir=MODEL_DIR):
+    """
+    Return a SHA-256 hex digest over the names and contents of the ``.joblib`` artifacts.
+
+    A packaged artifact records the hash of the files it was packed from, so
+    without ``.joblib`` files its recorded hash is returned: the version of a
+    model stays the same whichever form it is loaded from.
+    """
+    names = joblib_files(model_dir)
+    packaged = os.path.join(model_dir, PACKAGED_ARTIFACT)
+    if not names and os.path.exists(packaged):
+        from model_artifact import read_manifest
+
+        return read_manifest(packaged)['model_version']
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(model_dir, name), "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def load_bundle(model_dir=MODEL_DIR, timings=None, version=None):
+    """
+    Load the model, encoders, and scaler from ``model_dir``.
+
+    The packaged artifact is used when it was packed from ``version``;
+    otherwise, or when it fails to load, the ``.joblib`` files are loaded
+    (see ``load_joblib_bundle``). Errors are recorded on the returned bundle instead of being raised so the
+    app can still run in demonstration mode.
+
+    Parameters:
+    -----------
+    model_dir : str
+        Directory containing the ``.joblib`` artifacts
+    timings : dict, optional
+        Filled with the load time in seconds of each artifact file
+    version : str, optional
+        Content hash of ``model_dir`` (computed when omitted)
+
+    Returns:
+    --------
+    ModelBundle
+        The loaded components (``version`` is left as ``None``)
+    """
+    if timings is None:
+        timings = {}
+    if version is None:
+        version = content_hash(model_dir)
+
+    packaged = os.path.join(model_dir, PACKAGED_ARTIFACT)
+    if os.path.exists(packaged):
+        from model_artifact import load_artifact, read_manifest
+
+        try:
+            if read_manifest(packaged)['model_version'] == version:
+                start = time.perf_counter()
+                bundle = load_artifact(packaged)
+                timings[PACKAGED_ARTIFACT] = time.perf_counter() - start
+                bundle.version = None
+                return bundle
+        except Exception as e:
+            logger.warning("Cannot load %s (%s); loading the .joblib files instead", packaged, e)
+
+    return load_joblib_bundle(model_dir, timings)
+
+
+def load_joblib_bundle(model_dir=MODEL_DIR, timings=None, model_file=None):
+    """
+    Load the bundle from the ``.joblib`` files in ``model_dir``.
+
+    Missing encoder or scaler files are replaced by demonstration defaults.
+    The model is the single ``*_model.joblib`` file, or ``model_file``;
+    several candidates without ``model_file`` are an error rather than a
+    guess. Errors are recorded on the returned bundle.
+    """
+    if timings is None:
+        timings = {}
+
+    def timed_load(path):
+        start = time.perf_counter()
+        obj = joblib.load(path)
+        timings[os.path.basename(path)] = time.perf_counter() - start
+        return obj
+
+    model = None
+    feature_names = None
+    encoders = {}
+    scaler = None
+    error = None
+
+    try:
+        # Try to load model and feature names
+        if model_file is not None:
+            model_files = [model_file]
+        else:
+            model_files = [f for f in joblib_files(model_dir) if f.endswith("_model.joblib")]
+        if len(model_files) > 1:
+            raise ValueError(f"Several model files in {model_dir}: {', '.join(model_files)}; "
+                             "keep one or package the chosen one with "
+                             "'python model_artifact.py pack --model-file ...'")
+        if model_files:
+            model = timed_load(os.path.join(model_dir, model_files[0]))
+            feature_names = timed_load(os.path.join(model_dir, "feature_names.joblib"))
+
+        # Load encoders for categorical features
+        for feature in CATEGORICAL_FEATURES:
+            encoder_path = os.path.join(model_dir, f"encoder_{feature}.joblib")
+            if os.path.exists(encoder_path):
+                encoders[feature] = timed_load(encoder_path)
+            else:
+                encoders[feature] = _default_encoder(feature)
+
+        # Load scaler
+        scaler_path = os.path.join(model_dir, "scaler_numerical_features.joblib")
+        if os.path.exists(scaler_path):
+            scaler = timed_load(scaler_path)
+        else:
+            scaler = _default_scaler()
+
+    except Exception as e:
+        error = e
+
+    return ModelBundle(model, feature_names, encoders, scaler, version=None, error=error)
+
+
+class ModelRegistry:
+    """
+    Thread-safe, load-once holder of the model bundle.
+
+    ``get()`` returns the cached bundle. At most every ``check_interval``
+    seconds it compares the artifact ``stat`` signature with the one seen at
+    load time; when it differs the content hash is recomputed and the bundle
+    is reloaded only if the hash changed (a plain ``touch`` does not reload).
+    A bundle whose load failed (``error`` set) is retried every
+    ``check_interval`` seconds even if the files look unchanged.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, check_interval=1.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._signature = None
+        self._last_check = 0.0
+        self._stats = {
+            'loads': 0,
+            'hits': 0,
+            'misses': 0,
+            'stale_checks': 0,
+            'last_load_seconds': None,
+            'total_load_seconds': 0.0,
+            'file_load_seconds': {},
+            'loaded_at': None,
+            'version': None,
+        }
+
+    def get(self):
+        """Return the current :class:`ModelBundle`, loading or reloading it if needed."""
+        with self._lock:
+            bundle = self._bundle
+            if bundle is not None and (
+                    time.monotonic() - self._last_check < self.check_interval
+                    or (bundle.error is None and not self._is_stale())):
+                self._stats['hits'] += 1
+                return bundle
+            self._stats['misses'] += 1
+            return self._reload()
+
+    def reload(self):
+        """Force a reload of the bundle from disk."""
+        with self._lock:
+            return self._reload()
+
+    def stats(self):
+        """Return a snapshot of load timings and cache hit counts."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['file_load_seconds'] = dict(self._stats['file_load_seconds'])
+        return snapshot
+
+    def metric_families(self):
+        """Registry stats as Prometheus metric families (an ``instrumentation`` collector)."""
+        stats = self.stats()
+        labels = {'model_dir': self.model_dir}
+        return [
+            ('dropout_model_loads_total', 'counter', 'Model bundle loads from disk',
+             [(labels, stats['loads'])]),
+            ('dropout_model_registry_lookups_total', 'counter', 'Bundle lookups by result',
+             [(dict(labels, result='hit'), stats['hits']),
+              (dict(labels, result='miss'), stats['misses'])]),
+            ('dropout_model_last_load_seconds', 'gauge', 'Duration of the last bundle load',
+             [(labels, stats['last_load_seconds'])]),
+        ]
+
+    def _is_stale(self):
+        """Check the artifact signature; must be called with the lock held."""
+        self._last_check = time.monotonic()
+        signature = stat_signature(self.model_dir)
+        if signature == self._signature:
+            return False
+        self._stats['stale_checks'] += 1
+        try:
+            version = content_hash(self.model_dir)
+        except Exception:
+            # Files changing under us (e.g. mid-copy): reload, which records the error
+            return True
+        if version == self._bundle.version:
+            # Touched but unchanged: keep the bundle, remember the new signature
+            self._signature = signature
+            return False
+        return True
+
+    def _reload(self):
+        """Load the bundle from disk; must be called with the lock held."""
+        start = time.perf_counter()
+        signature = stat_signature(self.model_dir)
+        timings = {}
+        try:
+            version = content_hash(self.model_dir)
+        except Exception as e:
+            version = None
+            bundle = ModelBundle(None, None, {}, None, version=None, error=e)
+        else:
+            bundle = load_bundle(self.model_dir, timings=timings, version=version)
+        bundle.version = version
+        elapsed = time.perf_counter() - start
+        instrumentation.observe('model_load', elapsed)
+
+        self._bundle = bundle
+        self._signature = signature
+        self._last_check = time.monotonic()
+        self._stats['loads'] += 1
+        self._stats['last_load_seconds'] = elapsed
+        self._stats['total_load_seconds'] += elapsed
+        self._stats['file_load_seconds'] = timings
+        self._stats['loaded_at'] = time.time()
+        self._stats['version'] = version
+        return bundle
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(model_dir=MODEL_DIR):
+    """Return the process-wide :class:`ModelRegistry` for ``model_dir``."""
+    key = os.path.abspath(model_dir)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = ModelRegistry(model_dir)
+            _registries[key] = registry
+            instrumentation.register_collector(registry.metric_families)
+        return registry
@@ -0,0 +1,129 @@
+"""
+LRU/TTL cache of single-student predictions.
+
+Entries are keyed on the encoded and scaled model input vector (in
+``feature_names`` order), so form submissions that normalize to the same
+features share one entry no matter how the raw inputs were entered. The
+cache is tied to a model bundle version and clears itself when a different
+version is bound.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import instrumentation
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 3600.0
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live per entry.
+
+    Parameters:
+    -----------
+    maxsize : int
+        Maximum number of cached predictions (0 disables caching)
+    ttl : float or None
+        Seconds an entry stays valid; ``None`` keeps entries until evicted
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    @staticmethod
+    def make_key(input_array):
+        """Build the cache key of an encoded and scaled input row."""
+        return np.ascontiguousarray(input_array, dtype=np.float64).tobytes()
+
+    def ensure_version(self, version):
+        """Bind the cache to a model bundle version, clearing it if the version changed."""
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self._stats['invalidations'] += 1
+                self._entries.clear()
+                self._version = version
+
+    def get(self, key):
+        """Return a copy of the cached result for ``key``, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return dict(result)
+                del self._entries[key]
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key, result):
+        """Store ``result`` under ``key``, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['size'] = len(self._entries)
+            snapshot['maxsize'] = self.maxsize
+            snapshot['version'] = self._version
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        return snapshot
+
+    def metric_families(self):
+        """Cache stats as Prometheus metric families (an ``instrumentation`` collector)."""
+        stats = self.stats()
+        return [
+            ('dropout_prediction_cache_lookups_total', 'counter', 'Prediction cache lookups by result',
+             [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])]),
+            ('dropout_prediction_cache_removals_total', 'counter', 'Entries removed from the cache by reason',
+             [({'reason': reason}, stats[key]) for reason, key in
+              (('evicted', 'evictions'), ('expired', 'expirations'), ('invalidated', 'invalidations'))]),
+            ('dropout_prediction_cache_entries', 'gauge', 'Entries currently cached',
+             [({}, stats['size'])]),
+        ]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache(maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+    """Return the process-wide :class:`PredictionCache`, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PredictionCache(maxsize, ttl)
+            instrumentation.register_collector(_cache.metric_families)
+        return _cache
@@ -0,0 +1,155 @@
+"""
+Cached chart rendering for the Streamlit app.
+
+The static parts of every chart are rasterized once and reused:
+
+- the dropout gauge background (gray bar, four colored segments, ticks) is
+  drawn a single time; each prediction only copies that RGBA array and paints
+  the pointer onto it with NumPy
+- the confusion matrix is rendered once per model version and matrix values
+
+Figures are built with the object-oriented Agg API instead of ``pyplot``, so
+they are never registered with the global figure manager and are freed as
+soon as the image is extracted; memory stays flat over any number of
+predictions. matplotlib and seaborn are imported on first use only.
+"""
+import functools
+import io
+
+import numpy as np
+
+from instrumentation import stage
+
+GAUGE_FIGSIZE = (4, 2.6)
+GAUGE_DPI = 100
+GAUGE_COLORS = ['green', 'yellow', 'orange', 'red']
+
+POINTER_COLOR = (0, 0, 0, 255)
+POINTER_WIDTH = 3
+
+
+def _new_figure(figsize, dpi):
+    """Create a ``Figure`` with an Agg canvas, detached from pyplot."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+@functools.lru_cache(maxsize=1)
+def gauge_background():
+    """
+    Rasterize the static gauge once.
+
+    Returns:
+    --------
+    tuple
+        ``(image, (col_0, col_100, row_bottom, row_top))``: the read-only
+        RGBA array and the pixel columns of 0% and 100% and the pixel rows
+        of the data y-limits -1 and 1
+    """
+    fig = _new_figure(GAUGE_FIGSIZE, GAUGE_DPI)
+    ax = fig.add_subplot()
+
+    # Create gauge segments
+    ax.barh(0, 100, color='lightgray', height=0.5)
+
+    # Add colored segments
+    segment_width = 25
+    for i, color in enumerate(GAUGE_COLORS):
+        ax.barh(0, segment_width, left=i * segment_width, color=color, height=0.5, alpha=0.7)
+
+    # Format plot
+    ax.set_xlim(0, 100)
+    ax.set_ylim(-1, 1)
+    ax.set_yticks([])
+    ax.set_xticks([0, 25, 50, 75, 100])
+    ax.set_xticklabels(['0%', '25%', '50%', '75%', '100%'])
+
+    # Remove spines
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    fig.tight_layout()
+    fig.canvas.draw()
+    image = np.asarray(fig.canvas.buffer_rgba()).copy()
+    image.setflags(write=False)
+
+    (x0, y0), (x1, y1) = ax.transData.transform([(0, -1), (100, 1)])
+    height = image.shape[0]
+    return image, (x0, x1, height - y0, height - y1)
+
+
+def _draw_segment(image, start, end, width, color):
+    """Paint a straight line of ``width`` pixels between two ``(col, row)`` points."""
+    n_points = int(max(abs(end[0] - start[0]), abs(end[1] - start[1]))) + 1
+    cols = np.rint(np.linspace(start[0], end[0], n_points)).astype(np.intp)
+    rows = np.rint(np.linspace(start[1], end[1], n_points)).astype(np.intp)
+    half = width // 2
+    row_offsets, col_offsets = np.meshgrid(np.arange(-half, width - half),
+                                           np.arange(-half, width - half), indexing='ij')
+    rows = (rows[:, None] + row_offsets.ravel()[None, :]).ravel()
+    cols = (cols[:, None] + col_offsets.ravel()[None, :]).ravel()
+    inside = (rows >= 0) & (rows < image.shape[0]) & (cols >= 0) & (cols < image.shape[1])
+    image[rows[inside], cols[inside]] = color
+
+
+def render_gauge(dropout_probability):
+    """
+    Return the gauge for ``dropout_probability`` as an RGBA array.
+
+    Only the pointer is drawn per call, on a copy of the cached background.
+    """
+    with stage('render_gauge'):
+        return _render_gauge(dropout_probability)
+
+
+def _render_gauge(dropout_probability):
+    background, (col_0, col_100, row_bottom, row_top) = gauge_background()
+    image = background.copy()
+
+    def to_pixel(x, y):
+        col = col_0 + (x / 100.0) * (col_100 - col_0)
+        row = row_bottom + (y + 1) / 2.0 * (row_top - row_bottom)
+        return col, row
+
+    # Add pointer: a vertical bar and a chevron below its center
+    pointer_pos = float(np.clip(dropout_probability, 0.0, 1.0)) * 100
+    _draw_segment(image, to_pixel(pointer_pos, -0.5), to_pixel(pointer_pos, 0.5),
+                  POINTER_WIDTH, POINTER_COLOR)
+    _draw_segment(image, to_pixel(pointer_pos - 3, -0.5), to_pixel(pointer_pos, 0), 1, POINTER_COLOR)
+    _draw_segment(image, to_pixel(pointer_pos, 0), to_pixel(pointer_pos + 3, -0.5), 1, POINTER_COLOR)
+    return image
+
+
+@functools.lru_cache(maxsize=8)
+def _confusion_matrix_png(matrix, title, model_version):
+    import seaborn as sns
+
+    fig = _new_figure((5, 4), 100)
+    ax = fig.add_subplot()
+    sns.heatmap(np.array(matrix), annot=True, fmt='d', cmap='Blues', cbar=False, ax=ax)
+    ax.set_xlabel('Predicted')
+    ax.set_ylabel('Actual')
+    ax.set_title(title)
+    ax.set_xticklabels(['Dropout', 'Graduate'])
+    ax.set_yticklabels(['Dropout', 'Graduate'])
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def render_confusion_matrix(matrix, title, model_version=None):
+    """
+    Return the confusion matrix heatmap as PNG bytes.
+
+    Rendered once per ``(matrix, title, model_version)`` and served from the
+    cache afterwards.
+    """
+    matrix = tuple(tuple(int(value) for value in row) for row in np.asarray(matrix))
+    with stage('render_confusion_matrix'):
+        return _confusion_matrix_png(matrix, title, model_version)
@@ -0,0 +1,497 @@
+"""
+Scoring core shared by the Streamlit app, batch jobs and the HTTP server.
+
+``calculate_derived_features`` and ``predict_dropout_risk`` score one student
+record. The ``*_batch`` functions are their column-wise equivalents for whole
+cohorts: categorical encoding, scaling and the derived features are NumPy
+array operations, and the model is called once per chunk with a single
+``predict_proba`` from which the predicted class is derived.
+
+This module does not import Streamlit or any plotting library, and pandas
+is only imported by the functions that parse or build DataFrames, so the
+single-record path needs nothing beyond NumPy and the model runtime.
+"""
+import io
+
+import numpy as np
+
+from instrumentation import count, stage
+from model_registry import CATEGORICAL_FEATURES
+
+# Raw integer codes used in data.csv, mapped to the labels the encoders were
+# fitted on (same mapping as the preprocessing in Notebook_Dani.ipynb)
+RAW_CATEGORY_LABELS = {
+    'Gender': ['Male', 'Female'],
+    'Scholarship_holder': ['No', 'Yes'],
+    'Debtor': ['No', 'Yes'],
+    'Tuition_fees_up_to_date': ['No', 'Yes'],
+    'Displaced': ['No', 'Yes'],
+    'Daytime_evening_attendance': ['Evening', 'Daytime'],
+}
+
+RESULT_COLUMNS = ['dropout_probability', 'graduate_probability',
+                  'predicted_status', 'risk_level']
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Below this many records the DataFrame set-up of the batch path (~5 ms)
+# costs more than scoring each record on the single-record path (~1 ms)
+MIN_RECORDS_BATCH = 8
+
+# Default values of the prediction form, used by benchmarks and examples
+EXAMPLE_STUDENT = {
+    'Gender': 'Male',
+    'Scholarship_holder': 'No',
+    'Debtor': 'No',
+    'Tuition_fees_up_to_date': 'Yes',
+    'Displaced': 'No',
+    'Daytime_evening_attendance': 'Daytime',
+    'Curricular_units_1st_sem_credited': 0,
+    'Curricular_units_1st_sem_enrolled': 6,
+    'Curricular_units_1st_sem_evaluations': 6,
+    'Curricular_units_1st_sem_approved': 5,
+    'Curricular_units_1st_sem_grade': 13,
+    'Curricular_units_2nd_sem_credited': 0,
+    'Curricular_units_2nd_sem_enrolled': 6,
+    'Curricular_units_2nd_sem_evaluations': 6,
+    'Curricular_units_2nd_sem_approved': 5,
+    'Curricular_units_2nd_sem_grade': 14,
+    'Admission_grade': 120,
+    'Previous_qualification_grade': 130,
+}
+
+
+def predict_dropout_risk(student_data, model, feature_names, encoders, scaler, cache=None,
+                         explain=False):
+    """
+    Predict the risk of a student dropping out.
+    
+    Parameters:
+    -----------
+    student_data : dict
+        Dictionary containing student features
+    model : sklearn model
+        Loaded prediction model
+    feature_names : list
+        List of feature names in the correct order
+    encoders : dict
+        Dictionary of label encoders for categorical features
+    scaler : sklearn scaler
+        Scaler for numerical features
+    cache : PredictionCache, optional
+        Cache consulted with the encoded and scaled input before the model is called
+    explain : bool
+        Add an ``explanation`` with the per-feature contributions (see
+        ``explanations.explain_row``) when the model supports it
+    
+    Returns:
+    --------
+    dict
+        Prediction results including probability and risk level
+    """
+    if model is None:
+        return {
+            'dropout_probability': 0.5,
+            'graduate_probability': 0.5,
+            'predicted_status': 'Demo Mode - No Model Loaded',
+            'risk_level': 'Medium'
+        }
+    
+    # Prepare the input data
+    input_data = []
+    
+    # Encode categorical features
+    with stage('encode'):
+        for feature in CATEGORICAL_FEATURES:
+            if feature in student_data and feature in encoders:
+                try:
+                    student_data[feature] = encoders[feature].transform([student_data[feature]])[0]
+                except:
+                    # Default to 0 if transformation fails
+                    student_data[feature] = 0
+    
+    # Scale numerical features
+    with stage('scale'):
+        numerical_features = [f for f in feature_names if f not in CATEGORICAL_FEATURES]
+        if len(numerical_features) > 0 and scaler is not None:
+            numerical_values = [student_data.get(f, 0) for f in numerical_features]
+            try:
+                scaled_values = scaler.transform([numerical_values])[0]
+                for i, feature in enumerate(numerical_features):
+                    student_data[feature] = scaled_values[i]
+            except:
+                # Use unscaled values if transformation fails
+                pass
+    
+    # Create the input array in the correct order
+    with stage('assemble'):
+        for feature in feature_names:
+            input_data.append(student_data.get(feature, 0))
+        
+        # Make prediction
+        input_array = np.array([input_data])
+    
+    if cache is not None:
+        with stage('cache_lookup'):
+            cache_key = cache.make_key(input_array)
+            cached = cache.get(cache_key)
+        if cached is not None:
+            count('dropout_predictions_total', path='single', cached='true')
+            if explain and 'explanation' not in cached:
+                _add_explanation(cached, model, feature_names, input_array)
+                cache.put(cache_key, cached)
+            return cached
+    
+    # Predict the probabilities once and derive the class from them
+    # (same rule as XGBClassifier.predict, without a second tree traversal)
+    with stage('predict_proba'):
+        probability = model.predict_proba(input_array)[0]
+    
+    # Interpret the results
+    with stage('interpret'):
+        result = {
+            'dropout_probability': float(probability[0]),
+            'graduate_probability': float(probability[1]),
+            'predicted_status': 'Graduate' if probability[1] > 0.5 else 'Dropout',
+            'risk_level': 'High' if probability[0] > 0.7 else 'Medium' if probability[0] > 0.3 else 'Low'
+        }
+    
+    if explain:
+        _add_explanation(result, model, feature_names, input_array)
+    
+    if cache is not None:
+        cache.put(cache_key, result)
+    
+    count('dropout_predictions_total', path='single', cached='false')
+    return result
+
+
+def _add_explanation(result, model, feature_names, input_array):
+    from explanations import explain_row, supports_explanations
+
+    if supports_explanations(model):
+        with stage('explain'):
+            result['explanation'] = explain_row(model, feature_names, input_array[0])
+
+
+def calculate_derived_features(data):
+    """Calculate derived features from the input data"""
+    with stage('derived_features'):
+        return _calculate_derived_features(data)
+
+
+def _calculate_derived_features(data):
+    # Average grade across semesters
+    data['avg_grade'] = (data['Curricular_units_1st_sem_grade'] + 
+                         data['Curricular_units_2nd_sem_grade']) / 2
+    
+    # Total approved units
+    data['total_approved_units'] = (data['Curricular_units_1st_sem_approved'] + 
+                                   data['Curricular_units_2nd_sem_approved'])
+    
+    # Total enrolled units
+    data['total_enrolled_units'] = (data['Curricular_units_1st_sem_enrolled'] + 
+                                   data['Curricular_units_2nd_sem_enrolled'])
+    
+    # Pass rate
+    if data['total_enrolled_units'] > 0:
+        data['pass_rate'] = (data['total_approved_units'] / 
+                            data['total_enrolled_units']) * 100
+    else:
+        data['pass_rate'] = 0
+    
+    # Grade improvement
+    data['grade_improvement'] = (data['Curricular_units_2nd_sem_grade'] - 
+                                data['Curricular_units_1st_sem_grade'])
+    
+    # Performance drop indicator
+    data['performance_drop'] = int((data['Curricular_units_2nd_sem_approved'] < 
+                                  data['Curricular_units_1st_sem_approved']) and 
+                                 (data['Curricular_units_2nd_sem_grade'] < 
+                                  data['Curricular_units_1st_sem_grade']))
+    
+    # Approval rates
+    if data['Curricular_units_1st_sem_enrolled'] > 0:
+        data['approval_rate_1st_sem'] = data['Curricular_units_1st_sem_approved'] / data['Curricular_units_1st_sem_enrolled']
+    else:
+        data['approval_rate_1st_sem'] = 0
+        
+    if data['Curricular_units_2nd_sem_enrolled'] > 0:
+        data['approval_rate_2nd_sem'] = data['Curricular_units_2nd_sem_approved'] / data['Curricular_units_2nd_sem_enrolled']
+    else:
+        data['approval_rate_2nd_sem'] = 0
+    
+    return data
+
+
+def detect_separator(header):
+    """Return ``;`` or ``,`` depending on which one splits the CSV header line."""
+    if isinstance(header, str):
+        header = header.encode("utf-8")
+    return ";" if header.count(b";") > header.count(b",") else ","
+
+
+def read_student_csv(source):
+    """
+    Read a student CSV separated by either ``;`` (like data.csv) or ``,``.
+
+    Parameters:
+    -----------
+    source : str, bytes or file-like
+        Path, raw bytes or an uploaded file object
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The parsed table
+    """
+    import pandas as pd
+
+    if isinstance(source, str):
+        with open(source, "rb") as fh:
+            raw = fh.read()
+    elif isinstance(source, (bytes, bytearray)):
+        raw = bytes(source)
+    else:
+        raw = source.read()
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+
+    sep = detect_separator(raw.split(b"\n", 1)[0])
+    # utf-8-sig strips the byte order mark data.csv starts with
+    return pd.read_csv(io.BytesIO(raw), sep=sep, encoding="utf-8-sig")
+
+
+def _column(df, name):
+    """Return ``df[name]`` as a float array, or zeros if the column is missing."""
+    import pandas as pd
+
+    if name in df:
+        return pd.to_numeric(df[name], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    return np.zeros(len(df), dtype=np.float64)
+
+
+def _safe_divide(numerator, denominator):
+    """Divide element-wise, returning 0 where the denominator is not positive."""
+    out = np.zeros_like(numerator, dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def calculate_derived_features_batch(df):
+    """
+    Calculate the derived features for every row of ``df``.
+
+    Column-wise equivalent of ``calculate_derived_features``; returns a copy
+    of ``df`` with the derived columns added.
+    """
+    data = df.copy()
+    grade_1st = _column(df, 'Curricular_units_1st_sem_grade')
+    grade_2nd = _column(df, 'Curricular_units_2nd_sem_grade')
+    approved_1st = _column(df, 'Curricular_units_1st_sem_approved')
+    approved_2nd = _column(df, 'Curricular_units_2nd_sem_approved')
+    enrolled_1st = _column(df, 'Curricular_units_1st_sem_enrolled')
+    enrolled_2nd = _column(df, 'Curricular_units_2nd_sem_enrolled')
+
+    total_approved = approved_1st + approved_2nd
+    total_enrolled = enrolled_1st + enrolled_2nd
+
+    data['avg_grade'] = (grade_1st + grade_2nd) / 2
+    data['total_approved_units'] = total_approved
+    data['total_enrolled_units'] = total_enrolled
+    data['pass_rate'] = _safe_divide(total_approved, total_enrolled) * 100
+    data['grade_improvement'] = grade_2nd - grade_1st
+    data['performance_drop'] = ((approved_2nd < approved_1st) &
+                                (grade_2nd < grade_1st)).astype(np.int64)
+    data['approval_rate_1st_sem'] = _safe_divide(approved_1st, enrolled_1st)
+    data['approval_rate_2nd_sem'] = _safe_divide(approved_2nd, enrolled_2nd)
+    return data
+
+
+def encode_categorical_batch(feature, values, encoder):
+    """
+    Encode a whole categorical column with a fitted ``LabelEncoder``.
+
+    Accepts either the string labels used by the app ("Yes", "Male", ...)
+    or the raw integer codes of data.csv. Unknown values are encoded as 0,
+    like the single-record path.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "biuf":
+        labels = np.asarray(RAW_CATEGORY_LABELS[feature], dtype=object)
+        raw = np.where(np.isfinite(values), values, -1).astype(np.int64)
+        valid = (raw >= 0) & (raw < len(labels))
+        values = np.where(valid, labels[np.clip(raw, 0, len(labels) - 1)], None)
+    else:
+        values = values.astype(object)
+
+    codes = np.zeros(len(values), dtype=np.float64)
+    for code, label in enumerate(encoder.classes_):
+        codes[values == label] = code
+    return codes
+
+
+def build_feature_matrix(df, feature_names, encoders, scaler):
+    """
+    Build the encoded and scaled model input for every row of ``df``.
+
+    ``df`` must already contain the derived features. Columns are returned
+    in ``feature_names`` order; missing inputs are treated as 0.
+    """
+    n_rows = len(df)
+    matrix = np.empty((n_rows, len(feature_names)), dtype=np.float64)
+
+    numerical_idx = []
+    for j, feature in enumerate(feature_names):
+        if feature in CATEGORICAL_FEATURES:
+            if feature in df and feature in encoders:
+                matrix[:, j] = encode_categorical_batch(feature, df[feature].to_numpy(),
+                                                        encoders[feature])
+            else:
+                matrix[:, j] = _column(df, feature)
+        else:
+            matrix[:, j] = _column(df, feature)
+            numerical_idx.append(j)
+
+    # Scale numerical features (skipped for an unfitted scaler, as in the app)
+    if numerical_idx and scaler is not None and hasattr(scaler, "mean_"):
+        numerical = matrix[:, numerical_idx]
+        numerical -= scaler.mean_
+        numerical /= scaler.scale_
+        matrix[:, numerical_idx] = numerical
+
+    return matrix
+
+
+def interpret_probabilities(dropout_probability, graduate_probability):
+    """Derive predicted status and risk level arrays from the class probabilities."""
+    dropout_probability = np.asarray(dropout_probability, dtype=np.float64)
+    graduate_probability = np.asarray(graduate_probability, dtype=np.float64)
+    # Same rule as XGBClassifier.predict: the positive class wins above 0.5
+    predicted_status = np.where(graduate_probability > 0.5, 'Graduate', 'Dropout')
+    risk_level = np.select([dropout_probability > 0.7, dropout_probability > 0.3],
+                           ['High', 'Medium'], default='Low')
+    return predicted_status, risk_level
+
+
+def predict_dropout_risk_batch(df, model, feature_names, encoders, scaler,
+                               chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Predict the dropout risk of every student in ``df``.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Student records, either app-style labels or the raw data.csv schema
+    model : sklearn model
+        Loaded prediction model
+    feature_names : list
+        List of feature names in the correct order
+    encoders : dict
+        Dictionary of label encoders for categorical features
+    scaler : sklearn scaler
+        Scaler for numerical features
+    chunk_size : int
+        Number of rows passed to each ``predict_proba`` call
+
+    Returns:
+    --------
+    pandas.DataFrame
+        ``df`` with the derived features and the prediction columns appended
+    """
+    with stage('batch_derived_features'):
+        scored = calculate_derived_features_batch(df)
+
+    if model is None:
+        scored['dropout_probability'] = 0.5
+        scored['graduate_probability'] = 0.5
+        scored['predicted_status'] = 'Demo Mode - No Model Loaded'
+        scored['risk_level'] = 'Medium'
+        return scored
+
+    probability = np.empty((len(scored), 2), dtype=np.float64)
+    for start in range(0, len(scored), chunk_size):
+        chunk = scored.iloc[start:start + chunk_size]
+        with stage('batch_feature_matrix'):
+            matrix = build_feature_matrix(chunk, feature_names, encoders, scaler)
+        with stage('batch_predict_proba'):
+            probability[start:start + len(chunk)] = model.predict_proba(matrix)
+    count('dropout_predictions_total', len(scored), path='batch', cached='false')
+
+    predicted_status, risk_level = interpret_probabilities(probability[:, 0], probability[:, 1])
+    scored['dropout_probability'] = probability[:, 0]
+    scored['graduate_probability'] = probability[:, 1]
+    scored['predicted_status'] = predicted_status
+    scored['risk_level'] = risk_level
+    return scored
+
+
+def predict_dropout_risk_records(records, model, feature_names, encoders, scaler, cache=None,
+                                 explain=False):
+    """
+    Score a list of form-style student records with one ``predict_proba`` call.
+
+    Returns the same result dicts as ``predict_dropout_risk`` (one per
+    record, in order) and shares its ``cache`` entries: the batch input
+    rows are bit-identical to the single-record ones, so a record scored
+    here is a cache hit there and vice versa. Only the cache misses are
+    sent to the model. Fewer than ``MIN_RECORDS_BATCH`` records are scored
+    one by one with ``predict_dropout_risk``, which is faster for them.
+    """
+    import pandas as pd
+
+    if model is None or len(records) < MIN_RECORDS_BATCH:
+        return [predict_dropout_risk(calculate_derived_features(dict(record)), model, feature_names,
+                                     encoders, scaler, cache=cache, explain=explain)
+                for record in records]
+
+    with stage('batch_derived_features'):
+        derived = calculate_derived_features_batch(pd.DataFrame.from_records(records))
+    with stage('batch_feature_matrix'):
+        matrix = build_feature_matrix(derived, feature_names, encoders, scaler)
+
+    results = [None] * len(records)
+    keys = [None] * len(records)
+    if cache is not None:
+        with stage('cache_lookup'):
+            for i in range(len(records)):
+                keys[i] = cache.make_key(matrix[i:i + 1])
+                cached = cache.get(keys[i])
+                if cached is not None and (not explain or 'explanation' in cached):
+                    results[i] = cached
+    missing = [i for i, result in enumerate(results) if result is None]
+    count('dropout_predictions_total', len(records) - len(missing), path='records', cached='true')
+    if not missing:
+        return results
+
+    with stage('batch_predict_proba'):
+        probability = np.asarray(model.predict_proba(matrix[missing]), dtype=np.float64)
+    predicted_status, risk_level = interpret_probabilities(probability[:, 0], probability[:, 1])
+
+    contributions = None
+    if explain:
+        from explanations import contribution_matrix, explanation_from_contributions, supports_explanations
+
+        if supports_explanations(model):
+            with stage('explain'):
+                contributions = contribution_matrix(model, matrix[missing])
+
+    for j, i in enumerate(missing):
+        result = {
+            'dropout_probability': float(probability[j, 0]),
+            'graduate_probability': float(probability[j, 1]),
+            'predicted_status': str(predicted_status[j]),
+            'risk_level': str(risk_level[j]),
+        }
+        if contributions is not None:
+            result['explanation'] = explanation_from_contributions(contributions[j], feature_names)
+        if cache is not None:
+            cache.put(keys[i], result)
+        results[i] = result
+    count('dropout_predictions_total', len(missing), path='records', cached='false')
+    return results
+
+
+def scored_to_csv_bytes(scored):
+    """Serialize a scored table to UTF-8 CSV bytes for download."""
+    return scored.to_csv(index=False).encode("utf-8")
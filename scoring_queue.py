@@ -0,0 +1,262 @@
+"""
+Asyncio scoring queue shared by all sessions of the Streamlit app.
+
+Every Streamlit session runs its script in its own thread, and without the
+queue each form submission calls the model on its own: simultaneous
+submissions of different users then compete for the GIL and the model one
+``predict_proba`` call at a time. ``AsyncScoringQueue`` runs an asyncio
+event loop in one background thread instead:
+
+- sessions hand their record to the loop (``submit`` from a thread,
+  ``await score(...)`` from a coroutine) and wait for their own result
+- the loop takes the first pending record plus every record already
+  waiting (at most ``max_batch_size``) and scores them with one batched call
+  in a single worker thread. When the model is idle a submission is
+  dispatched at once. Records that arrive while a batch is running are
+  coalesced into the next batch. A positive ``window`` additionally waits
+  that long for more records before each batch. If the call fails, each
+  record is scored on its own, so only the failing submission gets the error
+- the queue is bounded (``max_pending``): when it is full a submission waits
+  at most ``enqueue_timeout`` seconds for room and then fails with
+  ``ScoringQueueFull``, so overload shows up as a fast "busy" answer instead
+  of an ever growing backlog
+
+Without a window, a submission to an idle queue only pays two thread
+hand-offs. Under load, batches form on their own from the records that
+queue up behind a running batch. ``benchmarks/queue_load_test.py`` measures
+both cases against inline scoring.
+
+The app's queue (``get_scoring_queue``) scores with
+``predict_dropout_risk_records``, so results, explanations and the shared
+prediction cache are the same as for ``predict_dropout_risk``. Window,
+batch size and queue bound are read from ``SCORING_QUEUE_WINDOW_MS``,
+``SCORING_QUEUE_MAX_BATCH`` and ``SCORING_QUEUE_MAX_PENDING``.
+"""
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+
+import instrumentation
+
+DEFAULT_WINDOW = float(os.environ.get("SCORING_QUEUE_WINDOW_MS", 0)) / 1000.0
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("SCORING_QUEUE_MAX_BATCH", 64))
+DEFAULT_MAX_PENDING = int(os.environ.get("SCORING_QUEUE_MAX_PENDING", 256))
+DEFAULT_ENQUEUE_TIMEOUT = 1.0
+
+
+class ScoringQueueFull(RuntimeError):
+    """Raised when a record cannot be queued because the queue stays full."""
+
+
+class AsyncScoringQueue:
+    """
+    Coalesce concurrent single-record submissions into batched model calls.
+
+    Parameters:
+    -----------
+    score_batch : callable
+        ``score_batch(records) -> results``, one result per record; runs in
+        the queue's worker thread
+    max_batch_size : int
+        Most records scored by one call
+    window : float
+        Seconds to wait for more records after the first record of a batch;
+        0 dispatches immediately with whatever is already queued
+    max_pending : int
+        Most records waiting in the queue (backpressure bound)
+    enqueue_timeout : float
+        Seconds a submission waits for room before ``ScoringQueueFull``
+    """
+
+    def __init__(self, score_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, window=DEFAULT_WINDOW,
+                 max_pending=DEFAULT_MAX_PENDING, enqueue_timeout=DEFAULT_ENQUEUE_TIMEOUT):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'failed': 0,
+            'batches': 0,
+            'scored': 0,
+            'max_batch_size_seen': 0,
+            'max_pending_seen': 0,
+            'batch_seconds': 0.0,
+        }
+        self._loop = asyncio.new_event_loop()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix="scoring-queue-model")
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="scoring-queue", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._pending = asyncio.Queue(self.max_pending)
+        self._batcher = self._loop.create_task(self._batch_loop())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def score(self, record):
+        """Queue ``record`` and wait for its result; must run on the queue's event loop."""
+        future = self._loop.create_future()
+        try:
+            await asyncio.wait_for(self._pending.put((record, future)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self._stats['rejected'] += 1
+            raise ScoringQueueFull(
+                f"Scoring queue is full ({self.max_pending} records pending)") from None
+        self._stats['submitted'] += 1
+        self._stats['max_pending_seen'] = max(self._stats['max_pending_seen'], self._pending.qsize())
+        return await future
+
+    def submit(self, record, timeout=None):
+        """
+        Score ``record`` from any thread other than the queue's own.
+
+        Blocks until the result is ready (or ``timeout`` seconds pass) and
+        raises ``ScoringQueueFull`` under backpressure. On a timeout the
+        submission is withdrawn, so it is not scored after all.
+        """
+        future = asyncio.run_coroutine_threadsafe(self.score(record), self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def _collect(self):
+        """Wait for the first pending record, then take the queued ones and, with a window, wait for more."""
+        batch = [await self._pending.get()]
+        deadline = self._loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            if not self._pending.empty():
+                batch.append(self._pending.get_nowait())
+                continue
+            if self.window <= 0:
+                break
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self):
+        while True:
+            batch = await self._collect()
+            # Submissions whose caller gave up are dropped before scoring
+            batch = [(record, future) for record, future in batch if not future.done()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                results = await self._score(batch)
+            except Exception as e:
+                await self._score_each(batch, e)
+                continue
+            seconds = time.perf_counter() - started
+            instrumentation.observe('queue_batch', seconds)
+            self._stats['batches'] += 1
+            self._stats['scored'] += len(batch)
+            self._stats['batch_seconds'] += seconds
+            self._stats['max_batch_size_seen'] = max(self._stats['max_batch_size_seen'], len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _score(self, batch):
+        results = await self._loop.run_in_executor(
+            self._executor, self.score_batch, [record for record, _ in batch])
+        if len(results) != len(batch):
+            raise RuntimeError(f"Scored {len(results)} results for {len(batch)} records")
+        return results
+
+    async def _score_each(self, batch, batch_error):
+        """Complete every future of a failed batch by scoring its records one at a time."""
+        for item in batch:
+            future = item[1]
+            if future.done():
+                continue
+            try:
+                result = batch_error if len(batch) == 1 else (await self._score([item]))[0]
+            except Exception as e:
+                result = e
+            if isinstance(result, Exception):
+                self._stats['failed'] += 1
+                if not future.done():
+                    future.set_exception(result)
+            else:
+                self._stats['scored'] += 1
+                if not future.done():
+                    future.set_result(result)
+
+    def pending(self):
+        """Number of records currently waiting to be batched."""
+        return self._pending.qsize()
+
+    def stats(self):
+        """Return submission, rejection and batch counters plus the mean batch size."""
+        snapshot = dict(self._stats)
+        snapshot['pending'] = self.pending()
+        snapshot['mean_batch_size'] = (snapshot['scored'] / snapshot['batches']
+                                       if snapshot['batches'] else 0.0)
+        return snapshot
+
+    def metric_families(self):
+        """Queue stats as Prometheus metric families (an ``instrumentation`` collector)."""
+        stats = self.stats()
+        return [
+            ('dropout_scoring_queue_submissions_total', 'counter', 'Records submitted to the scoring queue',
+             [({'result': 'accepted'}, stats['submitted']), ({'result': 'rejected'}, stats['rejected'])]),
+            ('dropout_scoring_queue_batches_total', 'counter', 'Batched model calls made by the queue',
+             [({}, stats['batches'])]),
+            ('dropout_scoring_queue_records_total', 'counter', 'Records scored by the queue',
+             [({'result': 'scored'}, stats['scored']), ({'result': 'failed'}, stats['failed'])]),
+            ('dropout_scoring_queue_pending', 'gauge', 'Records waiting in the queue',
+             [({}, stats['pending'])]),
+        ]
+
+    def close(self):
+        """Stop the event loop and the worker thread; pending submissions are cancelled."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._executor.shutdown(wait=True)
+        self._loop.close()
+
+
+def score_with_registry(records):
+    """Score ``records`` with the current model bundle, the prediction cache and explanations."""
+    from model_registry import get_model_registry
+    from prediction_cache import get_prediction_cache
+    from scoring import predict_dropout_risk_records
+
+    bundle = get_model_registry().get()
+    cache = get_prediction_cache()
+    cache.ensure_version(bundle.version)
+    return predict_dropout_risk_records(records, *bundle.as_tuple(), cache=cache, explain=True)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_scoring_queue():
+    """Return the process-wide :class:`AsyncScoringQueue` of the app, starting it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = AsyncScoringQueue(score_with_registry)
+            instrumentation.register_collector(_queue.metric_families)
+        return _queue
@@ -0,0 +1,383 @@
+"""
+Headless HTTP scoring service for the dropout prediction model.
+
+Runs next to the Streamlit UI and serves the same model without importing
+Streamlit or any plotting library. The model bundle is kept in memory by the
+shared model registry.
+
+Endpoints
+---------
+GET  /health          -> {"status": "ok", "model_version": ...}
+GET  /metrics         -> Prometheus text metrics (stage timings, counters, cache stats)
+POST /predict         -> one student record (same keys as the app form)
+POST /predict/batch   -> {"students": [record, ...]}
+POST /debug/profiler/start -> start the sampling profiler ({"interval_ms": 5} optional)
+POST /debug/profiler/stop  -> stop it and return the collapsed stacks as text
+
+The profiler endpoints are unauthenticated and expose code paths, so they
+are off (404) unless the server runs with ``--profiler`` or
+``DROPOUT_PROFILER=1``; only enable them where the port is not reachable
+by untrusted clients.
+
+Every record is validated before it is scored: all form fields must be
+present, numeric fields must be finite numbers, and categorical fields
+must be a form label ("Yes", "Male", ...) or its raw data.csv code (0/1).
+Invalid records are answered with 400 and never reach the model.
+
+Concurrent ``/predict`` requests are micro-batched: requests arriving within
+``--batch-window-ms`` of each other are scored together with a single
+``predict_proba`` call. If a batched call fails, its records are scored one
+by one so a failure only reaches the request that caused it. ``--compiled`` serves the NumPy-only compiled model
+(see ``compiled_model.py``) instead of the joblib bundle. ``--metrics``
+turns on the per-stage timings of ``instrumentation.py`` (also possible with
+``DROPOUT_METRICS=1``).
+
+Usage::
+
+    python scoring_server.py --host 0.0.0.0 --port 8000 [--compiled model/compiled_model.npz]
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import instrumentation
+from compiled_model import load_compiled_bundle
+from model_registry import MODEL_DIR, get_model_registry
+from model_registry import CATEGORICAL_FEATURES
+from scoring import (EXAMPLE_STUDENT, RAW_CATEGORY_LABELS, RESULT_COLUMNS,
+                     calculate_derived_features, predict_dropout_risk, predict_dropout_risk_batch)
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Seconds a batched /predict request waits for its result before answering 503
+RESULT_TIMEOUT = 30.0
+
+REQUIRED_FIELDS = list(EXAMPLE_STUDENT)
+
+
+def normalize_record(record):
+    """
+    Validate one student record and return it with the form's labels.
+
+    Both scoring paths go through this function, so a record gets the same
+    answer batched or not. Raw data.csv codes of categorical fields are
+    mapped to their labels (``Tuition_fees_up_to_date=1`` is ``"Yes"``) and
+    numeric strings are converted to numbers.
+
+    Raises:
+    -------
+    ValueError
+        If the record is not an object, misses a field or holds a value
+        that is not a valid number or category
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Expected a JSON object with the student record")
+    missing = [field for field in REQUIRED_FIELDS if field not in record]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    normalized = dict(record)
+    for field in REQUIRED_FIELDS:
+        value = record[field]
+        if field in CATEGORICAL_FEATURES:
+            labels = RAW_CATEGORY_LABELS[field]
+            if isinstance(value, str) and value in labels:
+                continue
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and value in range(len(labels))):
+                normalized[field] = labels[int(value)]
+                continue
+            raise ValueError(f"Invalid value for {field}: {value!r} "
+                             f"(expected one of {labels} or their codes 0-{len(labels) - 1})")
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"Invalid value for {field}: {value!r} (expected a number)")
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for {field}: {record[field]!r} (expected a number)")
+        if not math.isfinite(value):
+            raise ValueError(f"Invalid value for {field}: {record[field]!r} (expected a finite number)")
+        normalized[field] = value
+    return normalized
+
+
+def score_records(records, bundle):
+    """Score a list of student records with one batched model call."""
+    normalized = []
+    for i, record in enumerate(records):
+        try:
+            normalized.append(normalize_record(record))
+        except ValueError as e:
+            raise ValueError(f"Student {i}: {e}") from None
+    records = normalized
+    scored = predict_dropout_risk_batch(pd.DataFrame.from_records(records), *bundle.as_tuple())
+    results = scored[RESULT_COLUMNS].to_dict(orient="records")
+    for result in results:
+        result['dropout_probability'] = float(result['dropout_probability'])
+        result['graduate_probability'] = float(result['graduate_probability'])
+    return results
+
+
+def score_record(record, bundle):
+    """Score a single student record without batching."""
+    student_data = calculate_derived_features(normalize_record(record))
+    return predict_dropout_risk(student_data, *bundle.as_tuple())
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-record requests into batched model calls.
+
+    ``submit`` blocks the calling (request handler) thread until its result
+    is ready. A background thread waits for the first pending record, keeps
+    collecting for up to ``window`` seconds or ``max_batch_size`` records,
+    and scores them all with one call to ``score_batch``. If that call fails
+    or returns the wrong number of results, each record is retried on its
+    own with ``score_one`` (when given), so only the failing records get the
+    exception; every future is always completed.
+    """
+
+    def __init__(self, score_batch, max_batch_size=256, window=0.002, score_one=None):
+        self.score_batch = score_batch
+        self.score_one = score_one
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, record, timeout=RESULT_TIMEOUT):
+        """
+        Queue ``record`` for scoring and wait for its prediction.
+
+        Raises ``concurrent.futures.TimeoutError`` after ``timeout`` seconds.
+        """
+        future = concurrent.futures.Future()
+        self._pending.put((record, future))
+        return future.result(timeout)
+
+    def _collect(self):
+        """Block for the first pending record, then gather more within the window."""
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.score_batch([record for record, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Scored {len(results)} results for {len(batch)} records")
+            except Exception as e:
+                self._score_each(batch, e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _score_each(self, batch, batch_error):
+        """Complete every future of a failed batch with its own result or exception."""
+        for record, future in batch:
+            if self.score_one is None or len(batch) == 1:
+                future.set_exception(batch_error)
+                continue
+            try:
+                future.set_result(self.score_one(record))
+            except Exception as e:
+                future.set_exception(e)
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """JSON request handler; ``server.batcher`` may be ``None`` to disable batching."""
+
+    server_version = "DropoutScoring/1.0"
+
+    def do_GET(self):
+        if self.path == "/health":
+            bundle = self.server.get_bundle()
+            self._send_json(200, {
+                'status': 'ok' if bundle.model is not None else 'no_model',
+                'model_version': bundle.version,
+            })
+        elif self.path == "/metrics":
+            self._send_text(200, instrumentation.render_prometheus(),
+                            "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path.startswith("/debug/profiler/"):
+            if self.server.profiler_enabled:
+                self._handle_profiler()
+            else:
+                self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            if self.path == "/predict":
+                # Invalid records are rejected here, before they can join a batch
+                record = normalize_record(payload)
+                if self.server.batcher is not None:
+                    result = self.server.batcher.submit(record)
+                else:
+                    result = score_record(payload, self.server.get_bundle())
+                self._send_json(200, result)
+            elif self.path == "/predict/batch":
+                students = payload.get('students') if isinstance(payload, dict) else None
+                if not isinstance(students, list):
+                    raise ValueError("Expected a JSON object with a 'students' list")
+                self._send_json(200, {'predictions': score_records(students, self.server.get_bundle())})
+            else:
+                self._send_json(404, {'error': f"Unknown path: {self.path}"})
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+        except concurrent.futures.TimeoutError:
+            self._send_json(503, {'error': "Timed out waiting for the prediction"})
+        except Exception as e:
+            self._send_json(500, {'error': f"Prediction failed: {e}"})
+
+    def _handle_profiler(self):
+        if self.path == "/debug/profiler/start":
+            try:
+                payload = self._read_json() if int(self.headers.get('Content-Length') or 0) else {}
+                interval = float(payload.get('interval_ms', 5)) / 1000.0
+            except (ValueError, TypeError, AttributeError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            started = instrumentation.start_profiler(interval)
+            self._send_json(200 if started else 409, {'profiling': True, 'started': started})
+        elif self.path == "/debug/profiler/stop":
+            collapsed = instrumentation.stop_profiler()
+            if collapsed is None:
+                self._send_json(409, {'error': "The profiler is not running"})
+            else:
+                self._send_text(200, collapsed, "text/plain; charset=utf-8")
+        else:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            raise ValueError("Request body is empty")
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body is too large")
+        try:
+            return json.loads(self.rfile.read(length))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status, text, content_type):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ScoringHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for bursty clients."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def create_server(host="127.0.0.1", port=8000, model_dir=MODEL_DIR,
+                  batch_window_ms=2.0, max_batch_size=256, verbose=False, compiled_path=None,
+                  enable_profiler=None):
+    """
+    Create a ``ThreadingHTTPServer`` with the model loaded and batching configured.
+
+    ``enable_profiler`` serves the ``/debug/profiler/*`` endpoints; ``None``
+    reads ``DROPOUT_PROFILER`` from the environment.
+    """
+    if enable_profiler is None:
+        enable_profiler = os.environ.get("DROPOUT_PROFILER", "") not in ("", "0")
+    # Load the model before accepting requests
+    if compiled_path:
+        compiled_bundle = load_compiled_bundle(compiled_path)
+        get_bundle = lambda: compiled_bundle
+    else:
+        registry = get_model_registry(model_dir)
+        registry.get()
+        get_bundle = registry.get
+
+    server = ScoringHTTPServer((host, port), ScoringRequestHandler)
+    server.get_bundle = get_bundle
+    server.verbose = verbose
+    server.profiler_enabled = enable_profiler
+    server.batcher = None
+    if batch_window_ms > 0:
+        server.batcher = MicroBatcher(lambda records: score_records(records, get_bundle()),
+                                      max_batch_size=max_batch_size,
+                                      window=batch_window_ms / 1000.0,
+                                      score_one=lambda record: score_record(record, get_bundle()))
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve dropout predictions over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--batch-window-ms", type=float, default=2.0,
+                        help="Micro-batching window for /predict (0 disables batching)")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--compiled", help="Serve this compiled model artifact instead of the joblib bundle")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--metrics", action="store_true", help="Record per-stage timings for /metrics")
+    parser.add_argument("--profiler", action="store_true",
+                        help="Serve the unauthenticated /debug/profiler/* endpoints")
+    args = parser.parse_args()
+
+    if args.metrics:
+        instrumentation.enable()
+
+    server = create_server(args.host, args.port, args.model_dir, args.batch_window_ms,
+                           args.max_batch_size, args.verbose, args.compiled,
+                           enable_profiler=args.profiler or None)
+    print(f"Serving dropout predictions on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
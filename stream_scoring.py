@@ -0,0 +1,330 @@
+"""
+Streaming scorer for student extracts of any size.
+
+The input (raw ``data.csv`` schema, ``;`` or ``,`` separated) is read in
+fixed-size chunks. Each chunk gets the derived features of
+``calculate_derived_features``, is scored with one ``predict_proba`` call and
+is written out immediately with the same feature selection as
+``df_clean_processed.csv`` plus the prediction columns, so peak memory only
+depends on the chunk size.
+
+After every chunk a small checkpoint file records how many input rows (and
+output bytes) are done; ``--resume`` truncates any half-written output and
+continues from there. ``--start-row`` starts at an explicit row offset.
+
+With ``--workers N`` the chunks are scored by a process pool (see
+``parallel_scoring.py``) and still written in input order.
+
+Usage::
+
+    python stream_scoring.py data.csv scored.csv --chunk-size 50000 --resume
+    python stream_scoring.py extract.csv scored_parquet/ --format parquet --workers 8
+"""
+import argparse
+import functools
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from compiled_model import load_compiled_bundle
+from model_registry import MODEL_DIR, get_model_registry
+from scoring import (build_feature_matrix, calculate_derived_features_batch, detect_separator,
+                     interpret_probabilities)
+
+DEFAULT_STREAM_CHUNK_SIZE = 50000
+
+
+def checkpoint_path(output_path):
+    """Path of the checkpoint file that belongs to ``output_path``."""
+    return output_path.rstrip("/\\") + ".checkpoint.json"
+
+
+def read_checkpoint(output_path):
+    """Return the saved checkpoint for ``output_path``, or ``None``."""
+    path = checkpoint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _write_checkpoint(output_path, checkpoint):
+    path = checkpoint_path(output_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(checkpoint, fh)
+    os.replace(tmp_path, path)
+
+
+def iter_student_chunks(input_path, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, start_row=0):
+    """
+    Yield ``(first_row, DataFrame)`` chunks of ``input_path``, skipping ``start_row`` rows.
+
+    Skipped rows are consumed line by line without being parsed.
+    """
+    with open(input_path, encoding="utf-8-sig", newline="") as fh:
+        header = fh.readline()
+        sep = detect_separator(header)
+        columns = [c.strip() for c in header.rstrip("\r\n").split(sep)]
+        for _ in itertools.islice(fh, start_row):
+            pass
+        reader = pd.read_csv(fh, sep=sep, names=columns, header=None, chunksize=chunk_size)
+        first_row = start_row
+        for chunk in reader:
+            if chunk.empty:
+                continue
+            chunk = chunk.loc[:, [c for c in chunk.columns if c]]
+            chunk.index = pd.RangeIndex(first_row, first_row + len(chunk))
+            yield first_row, chunk
+            first_row += len(chunk)
+
+
+def score_chunk(chunk, bundle):
+    """Score one chunk and return the selected feature and prediction columns."""
+    model, feature_names, encoders, scaler = bundle.as_tuple()
+    derived = calculate_derived_features_batch(chunk)
+    matrix = build_feature_matrix(derived, feature_names, encoders, scaler)
+    probability = model.predict_proba(matrix).astype(np.float64)
+    predicted_status, risk_level = interpret_probabilities(probability[:, 0], probability[:, 1])
+
+    columns = [c for c in feature_names if c in derived]
+    if 'Status' in derived:
+        columns.append('Status')
+    out = derived.loc[:, columns]
+    out.insert(0, 'row_id', chunk.index.to_numpy())
+    out['dropout_probability'] = probability[:, 0]
+    out['graduate_probability'] = probability[:, 1]
+    out['predicted_status'] = predicted_status
+    out['risk_level'] = risk_level
+    return out
+
+
+def encode_csv_chunk(scored, first_row):
+    """Serialize a scored chunk to CSV; returns ``(n_rows, header, body)``."""
+    header = scored.iloc[:0].to_csv(index=False).encode("utf-8")
+    body = scored.to_csv(index=False, header=False).encode("utf-8")
+    return len(scored), header, body
+
+
+def write_parquet_part(directory, scored, first_row):
+    """Write a scored chunk as its own Parquet part file; returns ``(n_rows, None, None)``."""
+    part = os.path.join(directory, f"part-{first_row:012d}.parquet")
+    scored.to_parquet(part + ".tmp", index=False, engine="pyarrow")
+    os.replace(part + ".tmp", part)
+    return len(scored), None, None
+
+
+class _CsvSink:
+    """
+    Appends chunks to one CSV file; resumable by truncating to a byte offset.
+
+    ``encode`` may run in a worker process; ``commit`` runs in input order.
+    """
+
+    encode = staticmethod(encode_csv_chunk)
+
+    def __init__(self, path, resume_bytes=None):
+        if resume_bytes is None:
+            self._fh = open(path, "wb")
+        else:
+            self._fh = open(path, "r+b")
+            self._fh.truncate(resume_bytes)
+            self._fh.seek(resume_bytes)
+        self._write_header = self._fh.tell() == 0
+
+    def commit(self, encoded):
+        _, header, body = encoded
+        if self._write_header:
+            self._fh.write(header)
+            self._write_header = False
+        self._fh.write(body)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        return self._fh.tell()
+
+    def close(self):
+        self._fh.close()
+
+
+class _ParquetSink:
+    """Writes one Parquet part file per chunk into a directory (from ``encode``)."""
+
+    def __init__(self, path, resume_rows=None):
+        try:
+            import pyarrow  # noqa: F401  (fail early if Parquet support is missing)
+        except ImportError:
+            raise ImportError("--format parquet needs pyarrow; install it with "
+                              "'pip install pyarrow' (see requirements.txt)") from None
+
+        self.encode = functools.partial(write_parquet_part, path)
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if not name.startswith("part-"):
+                continue
+            first_row = int(name[len("part-"):].split(".")[0])
+            # Parts at or after the checkpoint are incomplete leftovers
+            if resume_rows is None or first_row >= resume_rows:
+                os.remove(os.path.join(path, name))
+
+    def commit(self, encoded):
+        return None
+
+    def close(self):
+        pass
+
+
+def _print_progress(progress):
+    print(f"\rscored {progress['rows']:,} rows "
+          f"({progress['rows_per_second']:,.0f} rows/s, {progress['seconds']:.1f} s)",
+          end="", file=sys.stderr, flush=True)
+
+
+def stream_score(input_path, output_path, bundle=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE,
+                 output_format="csv", start_row=0, resume=False, progress=_print_progress,
+                 workers=1, model_threads=1, model_dir=MODEL_DIR, compiled_path=None):
+    """
+    Score ``input_path`` chunk by chunk and write the results to ``output_path``.
+
+    Parameters:
+    -----------
+    input_path : str
+        Student extract in the raw data.csv schema
+    output_path : str
+        CSV file, or directory of part files for ``output_format="parquet"``
+    bundle : ModelBundle, optional
+        Model bundle to score with in this process (default: the compiled
+        bundle of ``compiled_path`` if given, else the registry bundle of
+        ``model_dir``, i.e. the same engine the workers use)
+    chunk_size : int
+        Rows per chunk; bounds peak memory
+    output_format : str
+        ``"csv"`` or ``"parquet"``
+    start_row : int
+        Input row offset to start from (ignored when resuming from a checkpoint)
+    resume : bool
+        Continue after the last completed chunk recorded in the checkpoint
+    progress : callable, optional
+        Called after every chunk with a dict of ``rows``, ``seconds`` and ``rows_per_second``
+    workers : int
+        Worker processes; 1 scores in this process
+    model_threads : int
+        Threads each worker's model may use (``workers * model_threads`` <= cores)
+    model_dir : str
+        Bundle directory the workers load from
+    compiled_path : str, optional
+        Compiled model artifact the workers load instead of ``model_dir``
+
+    Returns:
+    --------
+    dict
+        Summary with the number of rows scored in this run and the throughput
+    """
+    if bundle is None:
+        if compiled_path:
+            bundle = load_compiled_bundle(compiled_path)
+        else:
+            bundle = get_model_registry(model_dir).get()
+    if bundle.model is None:
+        raise ValueError("Cannot score: no model loaded")
+
+    checkpoint = read_checkpoint(output_path) if resume else None
+    if checkpoint is not None:
+        if checkpoint['input_path'] != os.path.abspath(input_path):
+            raise ValueError(f"Checkpoint was written for a different input file "
+                             f"({checkpoint['input_path']}); rescore from the start instead of resuming")
+        if checkpoint['output_format'] != output_format:
+            raise ValueError("Checkpoint was written with a different output format")
+        if checkpoint['model_version'] != bundle.version:
+            raise ValueError("Checkpoint was written with a different model bundle; "
+                             "rescore from the start instead of resuming")
+        start_row = checkpoint['rows_done']
+
+    if output_format == "csv":
+        sink = _CsvSink(output_path, checkpoint['output_bytes'] if checkpoint else None)
+    elif output_format == "parquet":
+        sink = _ParquetSink(output_path, start_row if checkpoint else None)
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    chunks = iter_student_chunks(input_path, chunk_size, start_row)
+    scorer = None
+    if workers > 1:
+        from parallel_scoring import ParallelScorer
+
+        scorer = ParallelScorer(workers, model_threads, model_dir, compiled_path)
+        # Workers also serialize their chunks; only the ordered commit stays here
+        encoded_chunks = scorer.map_chunks(chunks, sink.encode)
+    else:
+        encoded_chunks = ((first_row, sink.encode(score_chunk(chunk, bundle), first_row))
+                          for first_row, chunk in chunks)
+
+    rows = 0
+    started = time.perf_counter()
+    try:
+        for first_row, encoded in encoded_chunks:
+            output_bytes = sink.commit(encoded)
+            n_rows = encoded[0]
+            rows += n_rows
+            _write_checkpoint(output_path, {
+                'input_path': os.path.abspath(input_path),
+                'output_format': output_format,
+                'rows_done': first_row + n_rows,
+                'output_bytes': output_bytes,
+                'model_version': bundle.version,
+            })
+            if progress is not None:
+                seconds = time.perf_counter() - started
+                progress({'rows': rows, 'seconds': seconds,
+                          'rows_per_second': rows / seconds if seconds else 0.0})
+    finally:
+        sink.close()
+        if scorer is not None:
+            scorer.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        'start_row': start_row,
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream-score a large student extract")
+    parser.add_argument("input", help="CSV in the raw data.csv schema (';' or ',' separated)")
+    parser.add_argument("output", help="Output CSV file, or directory for --format parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_STREAM_CHUNK_SIZE)
+    parser.add_argument("--start-row", type=int, default=0, help="Input row offset to start from")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--compiled", help="Score with this compiled model artifact")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for parallel scoring")
+    parser.add_argument("--model-threads", type=int, default=1, help="Model threads per worker")
+    args = parser.parse_args()
+    if args.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--format parquet needs pyarrow; install it with 'pip install pyarrow'")
+
+    if args.compiled:
+        bundle = load_compiled_bundle(args.compiled)
+    else:
+        bundle = get_model_registry(args.model_dir).get()
+
+    summary = stream_score(args.input, args.output, bundle, args.chunk_size, args.format,
+                           args.start_row, args.resume, workers=args.workers,
+                           model_threads=args.model_threads, model_dir=args.model_dir,
+                           compiled_path=args.compiled)
+    print(file=sys.stderr)
+    print(f"Scored {summary['rows']:,} rows starting at row {summary['start_row']:,} "
+          f"in {summary['seconds']:.1f} s ({summary['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Vectorized what-if sensitivity analysis around one student profile.
+
+For every input of the prediction form the profile is copied once per
+candidate value (integer steps over the form's slider range, or every
+category label), giving a grid of perturbed records. The whole grid goes
+through ``calculate_derived_features_batch``, ``build_feature_matrix`` and
+a single ``predict_proba`` call, so the sweep over all inputs (about 600
+points) or a two-input grid of thousands of points takes milliseconds
+instead of one form submission per point.
+"""
+import numpy as np
+
+from model_registry import CATEGORICAL_FEATURES
+from scoring import build_feature_matrix, calculate_derived_features_batch
+
+# Candidate values per form input: the slider ranges and selectbox options of the app
+WHAT_IF_VALUES = {
+    'Gender': ['Male', 'Female'],
+    'Scholarship_holder': ['No', 'Yes'],
+    'Debtor': ['No', 'Yes'],
+    'Tuition_fees_up_to_date': ['No', 'Yes'],
+    'Displaced': ['No', 'Yes'],
+    'Daytime_evening_attendance': ['Daytime', 'Evening'],
+    'Admission_grade': list(range(0, 201)),
+    'Previous_qualification_grade': list(range(0, 201)),
+    'Curricular_units_1st_sem_credited': list(range(0, 11)),
+    'Curricular_units_1st_sem_enrolled': list(range(0, 11)),
+    'Curricular_units_1st_sem_evaluations': list(range(0, 21)),
+    'Curricular_units_1st_sem_approved': list(range(0, 11)),
+    'Curricular_units_1st_sem_grade': list(range(0, 21)),
+    'Curricular_units_2nd_sem_credited': list(range(0, 11)),
+    'Curricular_units_2nd_sem_enrolled': list(range(0, 11)),
+    'Curricular_units_2nd_sem_evaluations': list(range(0, 21)),
+    'Curricular_units_2nd_sem_approved': list(range(0, 11)),
+    'Curricular_units_2nd_sem_grade': list(range(0, 21)),
+}
+
+
+def perturbation_frame(student, changes):
+    """
+    Build one record per entry of ``changes`` from the base ``student``.
+
+    Parameters:
+    -----------
+    student : dict
+        Form-style student record (labels, before derived features)
+    changes : dict
+        Feature name -> array of values, all of the same length ``n``
+
+    Returns:
+    --------
+    pandas.DataFrame
+        ``n`` copies of ``student`` with the changed columns replaced
+    """
+    import pandas as pd
+
+    n_rows = len(next(iter(changes.values()))) if changes else 1
+    columns = {}
+    for feature, value in student.items():
+        if feature in changes:
+            columns[feature] = np.asarray(changes[feature])
+        else:
+            columns[feature] = np.full(n_rows, value, dtype=object if isinstance(value, str) else None)
+    for feature, values in changes.items():
+        columns.setdefault(feature, np.asarray(values))
+    return pd.DataFrame(columns)
+
+
+def score_frame(frame, model, feature_names, encoders, scaler):
+    """Dropout probability of every record in ``frame`` with one ``predict_proba`` call."""
+    derived = calculate_derived_features_batch(frame)
+    matrix = build_feature_matrix(derived, feature_names, encoders, scaler)
+    return np.asarray(model.predict_proba(matrix), dtype=np.float64)[:, 0]
+
+
+def sensitivity_sweep(student, model, feature_names, encoders, scaler, features=None,
+                      values=WHAT_IF_VALUES):
+    """
+    Vary one input at a time over its candidate values.
+
+    Returns:
+    --------
+    dict
+        ``baseline`` (dropout probability of the unchanged profile) and
+        ``curves``: feature -> ``{'values': list, 'dropout_probability': array}``
+    """
+    if features is None:
+        features = [f for f in values if f in student]
+
+    # Row 0 is the unchanged profile; each feature then gets a block of rows
+    blocks = [(None, [None])]
+    blocks += [(feature, values[feature]) for feature in features]
+    n_rows = sum(len(candidates) for _, candidates in blocks)
+
+    changes = {}
+    offset = 1
+    for feature, candidates in blocks[1:]:
+        column = changes.get(feature)
+        if column is None:
+            column = changes[feature] = np.array([student[feature]] * n_rows, dtype=object)
+        column[offset:offset + len(candidates)] = candidates
+        offset += len(candidates)
+
+    probability = score_frame(perturbation_frame(student, changes), model, feature_names,
+                              encoders, scaler)
+
+    curves = {}
+    offset = 1
+    for feature, candidates in blocks[1:]:
+        curves[feature] = {
+            'values': list(candidates),
+            'dropout_probability': probability[offset:offset + len(candidates)],
+        }
+        offset += len(candidates)
+    return {'baseline': float(probability[0]), 'curves': curves}
+
+
+def sensitivity_grid(student, feature_x, feature_y, model, feature_names, encoders, scaler,
+                     values=WHAT_IF_VALUES):
+    """
+    Vary two inputs jointly over all combinations of their candidate values.
+
+    Returns ``(values_x, values_y, probability)`` where ``probability`` has
+    shape ``(len(values_y), len(values_x))``.
+    """
+    values_x = list(values[feature_x])
+    values_y = list(values[feature_y])
+    grid_x = np.tile(np.asarray(values_x, dtype=object), len(values_y))
+    grid_y = np.repeat(np.asarray(values_y, dtype=object), len(values_x))
+    frame = perturbation_frame(student, {feature_x: grid_x, feature_y: grid_y})
+    probability = score_frame(frame, model, feature_names, encoders, scaler)
+    return values_x, values_y, probability.reshape(len(values_y), len(values_x))
+
+
+def rank_sensitivity(sweep):
+    """
+    Order the swept inputs by how far they can move the dropout probability.
+
+    Returns a list of dicts with the lowest and highest reachable
+    probability and the value that reaches the lowest one.
+    """
+    ranking = []
+    for feature, curve in sweep['curves'].items():
+        probability = curve['dropout_probability']
+        best = int(np.argmin(probability))
+        ranking.append({
+            'feature': feature,
+            'min_probability': float(probability.min()),
+            'max_probability': float(probability.max()),
+            'spread': float(probability.max() - probability.min()),
+            'best_value': curve['values'][best],
+            'categorical': feature in CATEGORICAL_FEATURES,
+        })
+    ranking.sort(key=lambda row: row['spread'], reverse=True)
+    return ranking